@@ -6,6 +6,7 @@ Deploy to Streamlit Cloud: https://streamlit.io/cloud
 import streamlit as st
 import os
 import json
+import hashlib
 import tempfile
 import zipfile
 import shutil
@@ -14,6 +15,13 @@ from io import BytesIO
 import pandas as pd
 from certificate_generator import CertificateGenerator
 from email_sender import EmailSender
+from email_validation import check_emails
+from instrumentation import Instrumentation
+from participant_loader import ParticipantLoadError, load_participants as load_participant_table
+from response_cache import ResponseCache
+from response_store import ResponseStore
+from sheets import SheetsConnection
+from sheets_buffer import SheetsWriteBuffer
 from pypdf import PdfReader
 from pdf2image import convert_from_bytes
 from PIL import Image
@@ -185,48 +193,39 @@ if 'authenticated' not in st.session_state:
 if 'send_emails_enabled' not in st.session_state:
     st.session_state.send_emails_enabled = False
 
-# Registration file path
-REGISTRATIONS_FILE = "registrations.json"
+# Registration log (an old registrations.json is migrated into it on first use)
+REGISTRATIONS_FILE = "registrations.jsonl"
+LEGACY_REGISTRATIONS_FILE = "registrations.json"
+
+def registrations_store():
+    """The append-only registration log"""
+    return ResponseStore(REGISTRATIONS_FILE, LEGACY_REGISTRATIONS_FILE)
 
 # Helper functions for registration management
 def load_registrations():
-    """Load all registrations from JSON file"""
-    if os.path.exists(REGISTRATIONS_FILE):
-        try:
-            with open(REGISTRATIONS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+    """Load all registrations from the registration log"""
+    try:
+        return registrations_store().read()
+    except:
+        return []
 
 def save_registration(name, email):
     """Save a new registration"""
-    registrations = load_registrations()
-    
-    # Check for duplicate email
-    if any(r['email'].lower() == email.lower() for r in registrations):
-        return False, "Email already registered!"
-    
-    # Add new registration
     new_registration = {
         'name': name,
         'email': email,
         'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     }
-    registrations.append(new_registration)
     
-    # Save to file
-    with open(REGISTRATIONS_FILE, 'w') as f:
-        json.dump(registrations, f, indent=2)
+    # Checked and added under one lock, so concurrent sessions can't both register an email
+    if not registrations_store().append_unless(new_registration, 'email', ignore_case=True):
+        return False, "Email already registered!"
     
     return True, "Registration successful!"
 
 def delete_registration(email):
     """Delete a registration by email"""
-    registrations = load_registrations()
-    registrations = [r for r in registrations if r['email'].lower() != email.lower()]
-    with open(REGISTRATIONS_FILE, 'w') as f:
-        json.dump(registrations, f, indent=2)
+    registrations_store().delete('email', email, ignore_case=True)
 
 def generate_qr_code(url):
     """Generate QR code for a URL"""
@@ -300,38 +299,18 @@ def validate_form_data(data, form_config):
     return errors
 
 # Google Sheets Integration
-import gspread
-from google.oauth2.service_account import Credentials
+@st.cache_resource(show_spinner=False)
+def get_sheets_connection():
+    """One Google Sheets connection per server process, shared by every session and rerun"""
+    return SheetsConnection.from_secrets(st.secrets["gsheets"])
 
 def connect_to_gsheet():
-    """Connect to Google Sheets using Streamlit Secrets"""
+    """Get the shared Google Sheets connection, or None if Sheets isn't configured"""
     try:
         # Check if secrets are available
-        if "gsheets" not in st.secrets:
+        if "gsheets" not in st.secrets or "sheet_url" not in st.secrets["gsheets"]:
             return None
-
-        # Create credentials from secrets
-        secret_dict = {
-            "type": st.secrets["gsheets"]["type"],
-            "project_id": st.secrets["gsheets"]["project_id"],
-            "private_key_id": st.secrets["gsheets"]["private_key_id"],
-            "private_key": st.secrets["gsheets"]["private_key"],
-            "client_email": st.secrets["gsheets"]["client_email"],
-            "client_id": st.secrets["gsheets"]["client_id"],
-            "auth_uri": st.secrets["gsheets"]["auth_uri"],
-            "token_uri": st.secrets["gsheets"]["token_uri"],
-            "auth_provider_x509_cert_url": st.secrets["gsheets"]["auth_provider_x509_cert_url"],
-            "client_x509_cert_url": st.secrets["gsheets"]["client_x509_cert_url"]
-        }
-        
-        scopes = [
-            "https://www.googleapis.com/auth/spreadsheets",
-            "https://www.googleapis.com/auth/drive"
-        ]
-        
-        credentials = Credentials.from_service_account_info(secret_dict, scopes=scopes)
-        client = gspread.authorize(credentials)
-        return client
+        return get_sheets_connection()
     except Exception as e:
         return None
 
@@ -360,8 +339,12 @@ def get_form_config_path(form_id):
     return f"{FORMS_DIR}/{form_id}.json"
 
 def get_form_responses_path(form_id):
-    """Get the path to a form's responses file"""
-    return f"{FORMS_DIR}/{form_id}_responses.json"
+    """Get the path to a form's responses log"""
+    return f"{FORMS_DIR}/{form_id}_responses.jsonl"
+
+def form_response_store(form_id):
+    """A form's append-only response log (migrating an old _responses.json on first use)"""
+    return ResponseStore(get_form_responses_path(form_id), f"{FORMS_DIR}/{form_id}_responses.json")
 
 def load_form_by_id(form_id):
     """Load a specific form configuration"""
@@ -381,6 +364,34 @@ def save_form_by_id(form_id, config):
     with open(form_path, 'w') as f:
         json.dump(config, f, indent=2)
 
+# Responses waiting to be appended to Google Sheets (kept across restarts)
+SHEETS_BUFFER_PATH = f"{FORMS_DIR}/sheets_buffer.db"
+
+def form_sheet_headers(form_id):
+    """Header row for a form's worksheet: timestamp plus the form's field ids"""
+    config = load_form_by_id(form_id)
+    return ['timestamp'] + [f['id'] for f in config['fields']] if config else []
+
+@st.cache_resource(show_spinner=False)
+def get_sheets_buffer(_sheets):
+    """One write-behind buffer (and flusher thread) per server process"""
+    os.makedirs(FORMS_DIR, exist_ok=True)
+    return SheetsWriteBuffer(SHEETS_BUFFER_PATH, _sheets, form_sheet_headers).start()
+
+def show_parked_responses(form_id):
+    """Warn about responses the buffer stopped sending to Google Sheets, with a retry button"""
+    sheets = connect_to_gsheet()
+    if not sheets:
+        return
+    buffer = get_sheets_buffer(sheets)
+    parked, error = buffer.parked(form_id)
+    if parked:
+        st.warning(f"⚠️ {parked} responses couldn't be added to Google Sheets ({error}). "
+                   f"They are still saved locally and shown below.")
+        if st.button("🔁 Retry sending to Google Sheets"):
+            buffer.retry(form_id)
+            st.rerun()
+
 def create_new_form(form_id, name, description):
     """Create a new form"""
     # Add to index
@@ -443,26 +454,18 @@ def create_new_form(form_id, name, description):
     }
     save_form_by_id(form_id, form_config)
     
-    # Create empty responses file
-    with open(get_form_responses_path(form_id), 'w') as f:
-        json.dump([], f)
+    # The responses log is created by the first response
+    get_response_cache().forget(form_id)
         
     # Try creating worksheet in Google Sheet if connected
-    client = connect_to_gsheet()
-    if client:
+    sheets = connect_to_gsheet()
+    if sheets:
         try:
-            # Open the main spreadsheet
-            if "sheet_url" in st.secrets["gsheets"]:
-                sheet = client.open_by_url(st.secrets["gsheets"]["sheet_url"])
-                # Check if worksheet already exists
-                if form_id not in [ws.title for ws in sheet.worksheets()]:
-                    worksheet = sheet.add_worksheet(title=form_id, rows=100, cols=20)
-                    # Add headers based on fields
-                    headers = ['timestamp'] + [f['id'] for f in form_config['fields']]
-                    worksheet.append_row(headers)
+            # Creates the worksheet with headers based on fields, unless it already exists
+            sheets.worksheet(form_id, headers=form_sheet_headers(form_id), rows=100)
         except Exception as e:
             # st.error(f"GSConnect Error: {e}")
-            pass 
+            sheets.recover(e, form_id)
 
 def delete_form(form_id):
     """Delete a form and its responses"""
@@ -474,95 +477,98 @@ def delete_form(form_id):
     # Delete files
     try:
         os.remove(get_form_config_path(form_id))
-        os.remove(get_form_responses_path(form_id))
+        form_response_store(form_id).remove()
     except:
         pass
         
+    get_response_cache().forget(form_id)
+    
     # Try deleting from Google Sheet
-    client = connect_to_gsheet()
-    if client:
+    sheets = connect_to_gsheet()
+    if sheets:
         try:
-            if "sheet_url" in st.secrets["gsheets"]:
-                sheet = client.open_by_url(st.secrets["gsheets"]["sheet_url"])
-                try:
-                    worksheet = sheet.worksheet(form_id)
-                    sheet.del_worksheet(worksheet)
-                except:
-                    pass
-        except Exception:
-            pass
+            get_sheets_buffer(sheets).forget(form_id)
+            sheets.delete_worksheet(form_id)
+        except Exception as e:
+            sheets.recover(e, form_id)
+
+# Seconds form responses and counts are cached between reruns (shared by all sessions)
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 30))
+
+@st.cache_resource(show_spinner=False)
+def get_response_cache():
+    """One response cache per server process, shared by every session and rerun"""
+    return ResponseCache(RESPONSE_CACHE_TTL)
 
 def load_form_responses(form_id):
-    """Load responses for a specific form - Prefer Google Sheets"""
+    """Load responses for a specific form, cached for RESPONSE_CACHE_TTL seconds"""
+    return get_response_cache().responses(form_id, lambda: fetch_form_responses(form_id))
+
+def count_form_responses(form_id):
+    """Count a form's responses without downloading them (cached like the responses)"""
+    return get_response_cache().count(form_id, lambda: fetch_form_response_count(form_id))
+
+def fetch_form_response_count(form_id):
+    """Count responses from the timestamp column only - Prefer Google Sheets"""
+    sheets = connect_to_gsheet()
+    if sheets:
+        try:
+            # Column A holds the timestamp of every response, below the header row
+            sent = max(0, len(sheets.worksheet(form_id).col_values(1)) - 1)
+            return sent + get_sheets_buffer(sheets).pending_count(form_id)
+        except Exception as e:
+            sheets.recover(e, form_id)
+    
+    return len(fetch_local_form_responses(form_id))
+
+def fetch_form_responses(form_id):
+    """Download responses for a specific form - Prefer Google Sheets"""
     # Try Google Sheets first
-    client = connect_to_gsheet()
-    if client:
+    sheets = connect_to_gsheet()
+    if sheets:
         try:
-            if "sheet_url" in st.secrets["gsheets"]:
-                sheet = client.open_by_url(st.secrets["gsheets"]["sheet_url"])
-                worksheet = sheet.worksheet(form_id)
-                records = worksheet.get_all_records()
-                return records
+            # Only the rows added since the last read are downloaded; responses
+            # still waiting in the write buffer are included too
+            return get_sheets_buffer(sheets).read(form_id, lambda: sheets.records(form_id))
         except Exception as e:
-            pass
+            sheets.recover(e, form_id)
 
     # Fallback to local file
-    responses_path = get_form_responses_path(form_id)
-    if os.path.exists(responses_path):
-        try:
-            with open(responses_path, 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+    return fetch_local_form_responses(form_id)
+
+def fetch_local_form_responses(form_id):
+    """Read responses for a specific form from its local log"""
+    try:
+        return form_response_store(form_id).read()
+    except:
+        return []
 
 def save_form_response(form_id, response):
-    """Save a response to a specific form - Save to BOTH"""
-    # 1. Save to Google Sheets
-    client = connect_to_gsheet()
-    if client:
-        try:
-            if "sheet_url" in st.secrets["gsheets"]:
-                sheet = client.open_by_url(st.secrets["gsheets"]["sheet_url"])
-                
-                # Check if worksheet exists, create if not
-                try:
-                    worksheet = sheet.worksheet(form_id)
-                except:
-                    # Create and add headers
-                    worksheet = sheet.add_worksheet(title=form_id, rows=1000, cols=20)
-                    # Load config to get headers
-                    config = load_form_by_id(form_id)
-                    if config:
-                        headers = ['timestamp'] + [f['id'] for f in config['fields']]
-                        worksheet.append_row(headers)
-                
-                # Prepare row data based on headers
-                # We need to ensure order matches headers
-                headers = worksheet.row_values(1)
-                row_data = []
-                # Simple matching
-                for header in headers:
-                    row_data.append(str(response.get(header, '')))
-                
-                worksheet.append_row(row_data)
-            
-        except Exception as e:
-            pass 
+    """Save a response to a specific form - Save to BOTH. Returns False if its email is already registered"""
+    # 1. Save to the local log (Backup): appends one line. With an email, the
+    # duplicate check and the append share one lock, so concurrent sessions
+    # can't both register the same address
+    store = form_response_store(form_id)
+    if response.get('email'):
+        if not store.append_unless(response, 'email', ignore_case=True):
+            return False
+    else:
+        store.append(response)
 
-    # 2. Save to Local JSON (Backup)
-    responses_path = get_form_responses_path(form_id)
-    responses = []
-    if os.path.exists(responses_path):
-        try:
-            with open(responses_path, 'r') as f:
-                responses = json.load(f)
-        except:
-            pass
-            
-    responses.append(response)
-    with open(responses_path, 'w') as f:
-        json.dump(responses, f, indent=2)
+    # 2. Queue for Google Sheets: committed locally now, appended in batches by the
+    # buffer's background flusher (which retries on quota errors)
+    sheets = connect_to_gsheet()
+    if sheets:
+        get_sheets_buffer(sheets).add(form_id, response)
+    
+    get_response_cache().changed(form_id, added=1)
+    return True
+
+def delete_form_response(form_id, registrations, email):
+    """Delete the responses with the given email from a form's local responses"""
+    form_response_store(form_id).delete('email', email)
+    removed = sum(1 for r in registrations if r.get('email') == email)
+    get_response_cache().changed(form_id, added=-removed)
 
 # Static credentials
 ADMIN_EMAIL = "mgmcet.ieee@gmail.com"
@@ -599,83 +605,115 @@ def convert_pdf_to_image(pdf_bytes):
         st.error(f"Error converting PDF to image: {e}")
         return None
 
+def show_email_report(report):
+    """Show the addresses the pre-flight email check flagged"""
+    if report.ok:
+        return
+    st.warning(f"⚠️ Email check: {report.count('invalid')} invalid, {report.count('typo')} likely typos, "
+               f"{report.count('duplicate')} duplicates removed. Invalid addresses still get a "
+               f"certificate but won't be emailed; likely typos are still emailed, so check them.")
+    with st.expander("📋 Flagged addresses", expanded=False):
+        st.dataframe(report.issues, use_container_width=True)
+
 def load_participants_from_csv(uploaded_file, include_emails=False):
     """Load participants from uploaded CSV file"""
     try:
-        df = pd.read_csv(uploaded_file)
-        
-        # Find name column
-        name_column = None
-        email_column = None
-        
-        for col in df.columns:
-            if 'name' in col.lower():
-                name_column = col
-            if 'email' in col.lower() or 'mail' in col.lower():
-                email_column = col
-        
-        if name_column is None:
-            st.error(f"No 'Name' column found. Available columns: {', '.join(df.columns)}")
-            return None
-        
+        table = load_participant_table(uploaded_file, include_emails=include_emails)
         if include_emails:
-            if email_column is None:
-                st.error(f"No 'Email' column found. Available columns: {', '.join(df.columns)}")
-                st.info("For email sending, your CSV must have both 'Name' and 'Email' columns.")
-                return None
-            
-            # Return list of dicts with name and email
-            participants = []
-            for _, row in df.iterrows():
-                name = str(row[name_column]) if pd.notna(row[name_column]) else None
-                email = str(row[email_column]) if pd.notna(row[email_column]) else None
-                if name and email:
-                    participants.append({'name': name, 'email': email})
-            
-            if not participants:
-                st.error("No valid participant data found in the file.")
-                return None
-            
-            return participants
-        else:
-            # Extract names only
-            names = df[name_column].dropna().astype(str).tolist()
-            
-            if not names:
-                st.error("No participant names found in the file.")
-                return None
-            
-            return names
-        
+            table, report = check_emails(table)
+            show_email_report(report)
+        return table.records() if include_emails else table.names
+    
+    except ParticipantLoadError as e:
+        st.error(f"{e}. {e.hint}" if e.hint else f"{e}.")
+        return None
     except Exception as e:
         st.error(f"Error loading CSV: {e}")
         return None
 
+# ZIP exports larger than this spill from memory to a temporary file on disk
+ZIP_SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+def new_instrumentation():
+    """Create an Instrumentation if the performance breakdown is switched on"""
+    return Instrumentation() if st.session_state.get('show_perf_stats') else None
+
+def show_instrumentation(instrumentation):
+    """Show per-stage timings and counters collected during a batch"""
+    if not instrumentation:
+        return
+    with st.expander("⏱️ Performance breakdown", expanded=True):
+        summary = instrumentation.summary()
+        if summary:
+            df = pd.DataFrame(summary)
+            for col in ['mean', 'p50', 'p90', 'p99', 'max']:
+                df[col] = (df[col] * 1000).round(2)
+            df['total'] = df['total'].round(3)
+            df = df.rename(columns={'total': 'total (s)', 'mean': 'mean (ms)', 'p50': 'p50 (ms)',
+                                    'p90': 'p90 (ms)', 'p99': 'p99 (ms)', 'max': 'max (ms)'})
+            st.dataframe(df, use_container_width=True)
+        if instrumentation.counters:
+            st.write(dict(instrumentation.counters))
+
+def show_shrunk_names(generator, names):
+    """Warn about names (or other fields) that only fit max_text_width below the minimum font size, like the CLI"""
+    generator.shrunk_names = generator.check_fit(names)
+    if generator.shrunk_names:
+        st.warning(f"⚠️ {len(generator.shrunk_names)} values had to be shrunk below the minimum font size "
+                   f"to fit the Max Text Width. Check these certificates, or widen the text area.")
+        with st.expander("📋 Shrunk names", expanded=False):
+            st.dataframe(pd.DataFrame(generator.shrunk_names, columns=['Value', 'Font size (pt)']),
+                         use_container_width=True)
+
+# Certificates of email runs that still have pending emails (kept for resuming)
+EMAIL_RUNS_DIR = "email_runs"
+
+def email_run_id(template_bytes, participants):
+    """Default outbox run for a template and participant list, so sending the same event again reuses it"""
+    digest = hashlib.sha256(template_bytes)
+    digest.update(json.dumps(participants, sort_keys=True, default=str).encode())
+    return f"web-{digest.hexdigest()[:12]}"
+
+def show_email_results(email_sender, successful, failed, failed_list):
+    """Show the outcome of a send or resume, like main.print_email_results"""
+    if email_sender.batch_summary['already_sent']:
+        st.info(f"↻ {email_sender.batch_summary['already_sent']} recipients already received their "
+                f"certificate in run {email_sender.batch_summary['run']} and were skipped")
+    if email_sender.batch_summary.get('missing'):
+        st.info(f"… {email_sender.batch_summary['missing']} pending emails have no certificate yet. Send "
+                f"their run again (same template, participants and Run ID) to generate and send them.")
+    if failed == 0:
+        st.success(f"🎉 Successfully sent {successful} emails!")
+    else:
+        st.warning(f"✅ Sent {successful} emails")
+        st.error(f"❌ Failed to send {failed} emails")
+        
+        # Show failed emails
+        st.write("### ❌ Failed Recipients")
+        failed_df = pd.DataFrame(failed_list)
+        st.dataframe(failed_df, use_container_width=True)
+
 def generate_certificates_zip(generator, names, config):
     """Generate all certificates and return as ZIP file"""
-    zip_buffer = BytesIO()
+    show_shrunk_names(generator, names)
     
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+    # PDFs are already compressed, so store them as-is instead of DEFLATEing again
+    zip_buffer = tempfile.SpooledTemporaryFile(max_size=config.get('zip_spool_max_bytes', ZIP_SPOOL_MAX_BYTES))
+    
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_STORED) as zip_file:
         progress_bar = st.progress(0)
         status_text = st.empty()
         
-        for i, name in enumerate(names):
+        for i, participant in enumerate(names):
+            name = generator.display_name(participant)
             status_text.text(f"Generating certificate {i+1}/{len(names)}: {name}")
             
-            # Generate certificate to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_file:
-                tmp_path = tmp_file.name
-            
-            try:
-                if generator.generate_certificate(name, tmp_path):
-                    # Add to ZIP
-                    clean_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in name)
-                    filename = config.get('filename_template', '{name}_Certificate.pdf').format(name=clean_name)
-                    zip_file.write(tmp_path, filename)
-            finally:
-                # Clean up temp file
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
+            # Generate certificate in memory and write it straight into the ZIP
+            pdf_bytes = generator.generate_certificate_bytes(participant)
+            if pdf_bytes is not None:
+                clean_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in name)
+                filename = config.get('filename_template', '{name}_Certificate.pdf').format(name=clean_name)
+                zip_file.writestr(filename, pdf_bytes)
             
             # Update progress
             progress_bar.progress((i + 1) / len(names))
@@ -902,10 +940,10 @@ def registration_page():
                 # Check for duplicate (using email if present)
                 responses = load_form_responses(form_id)
                 email_field = form_data.get('email', '')
-                if email_field and any(r.get('email', '').lower() == email_field.lower() for r in responses):
+                if (email_field and any(r.get('email', '').lower() == email_field.lower() for r in responses)
+                        or not save_form_response(form_id, registration)):
                     st.warning("⚠️ This email is already registered!")
                 else:
-                    save_form_response(form_id, registration)
                     st.success("✅ Registration successful!")
                     st.balloons()
                     st.info("🎓 You're registered! You'll receive your certificate after the event.")
@@ -937,6 +975,7 @@ def view_responses_page():
     )
     
     registrations = load_form_responses(selected_form_id)
+    show_parked_responses(selected_form_id)
     
     # Display registration link and QR code
     st.subheader("🔗 Share Registration Link")
@@ -1016,10 +1055,10 @@ def view_responses_page():
                 # Try to use name and email fields if they exist
                 participants = []
                 for r in registrations:
-                    participant = {
-                        'name': r.get('name', r.get('full_name', 'Unknown')),
-                        'email': r.get('email', '')
-                    }
+                    # Keep every form field so multi-field certificate layouts can use them
+                    participant = dict(r)
+                    participant['name'] = r.get('name', r.get('full_name', 'Unknown'))
+                    participant['email'] = r.get('email', '')
                     participants.append(participant)
                 
                 st.session_state.participants_data = participants
@@ -1036,9 +1075,7 @@ def view_responses_page():
             )
             if st.button("❌ Delete Selected", type="secondary"):
                 # Delete by email
-                updated_responses = [r for r in registrations if r.get('email') != email_to_delete]
-                with open(get_form_responses_path(selected_form_id), 'w') as f:
-                    json.dump(updated_responses, f, indent=2)
+                delete_form_response(selected_form_id, registrations, email_to_delete)
                 st.success("Registration deleted!")
                 st.rerun()
         else:
@@ -1084,7 +1121,7 @@ def form_builder_page():
     else:
         for form in forms_list:
             col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
-            responses_count = len(load_form_responses(form['id']))
+            responses_count = count_form_responses(form['id'])
             
             with col1:
                 st.markdown(f"**{form['name']}**")
@@ -1308,6 +1345,14 @@ else:
                 help="Vertical position of the text"
             )
             
+            st.session_state.config['max_text_width'] = st.number_input(
+                "Max Text Width",
+                min_value=0,
+                max_value=1000,
+                value=st.session_state.config.get('max_text_width', 0),
+                help="Shrink long names to fit this width (0 = no limit)"
+            )
+            
             st.divider()
             
             # Save/Load configuration
@@ -1336,6 +1381,12 @@ else:
                     except Exception as e:
                         st.error(f"Error loading config: {e}")
             
+            st.session_state.show_perf_stats = st.checkbox(
+                "⏱️ Show performance breakdown",
+                value=st.session_state.get('show_perf_stats', False),
+                help="Time each generation/sending stage and show the breakdown after a batch"
+            )
+            
             # Logout button at bottom
             st.divider()
             if st.button("🚪 Logout", type="secondary", use_container_width=True):
@@ -1428,14 +1479,10 @@ else:
                         else:
                             first_name = first_participant
                         
-                        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_cert:
-                            cert_path = tmp_cert.name
+                        cert_bytes = generator.generate_certificate_bytes(first_name)
                         
-                        if generator.generate_certificate(first_name, cert_path):
+                        if cert_bytes is not None:
                             # Show preview
-                            with open(cert_path, 'rb') as f:
-                                cert_bytes = f.read()
-                            
                             preview_image = convert_pdf_to_image(cert_bytes)
                             if preview_image:
                                 st.image(preview_image, caption=f"Preview: {first_name}", use_container_width=True)
@@ -1450,7 +1497,6 @@ else:
                         
                         # Cleanup
                         os.remove(template_path)
-                        os.remove(cert_path)
                         
                     except Exception as e:
                         st.error(f"Error generating preview: {e}")
@@ -1471,14 +1517,17 @@ else:
                             tmp_template.write(st.session_state.template_file.getvalue())
                             template_path = tmp_template.name
                         
-                        # Get names list (extract from dicts if needed)
-                        if has_emails:
+                        # Get names list (extract from dicts if needed; multi-field layouts keep whole rows)
+                        if has_emails and st.session_state.config.get('fields'):
+                            names = st.session_state.participants_data
+                        elif has_emails:
                             names = [p['name'] for p in st.session_state.participants_data]
                         else:
                             names = st.session_state.participants_data
                         
                         # Generate all certificates
-                        generator = CertificateGenerator(template_path, st.session_state.config)
+                        instrumentation = new_instrumentation()
+                        generator = CertificateGenerator(template_path, st.session_state.config, instrumentation)
                         zip_buffer = generate_certificates_zip(
                             generator,
                             names,
@@ -1489,11 +1538,14 @@ else:
                         os.remove(template_path)
                         
                         st.success(f"🎉 Successfully generated {len(names)} certificates!")
+                        show_instrumentation(instrumentation)
                         
                         # Download ZIP
+                        zip_data = zip_buffer.read()
+                        zip_buffer.close()
                         st.download_button(
                             label="📦 Download All Certificates (ZIP)",
-                            data=zip_buffer.getvalue(),
+                            data=zip_data,
                             file_name="certificates.zip",
                             mime="application/zip",
                             type="primary"
@@ -1567,79 +1619,102 @@ IEEE Student Branch MGMCET"""
             
             st.divider()
             
-            if st.button("📨 Send All Certificates via Email", type="primary"):
-                if not sender_email or not sender_password:
-                    st.error("❌ Please provide email and password!")
-                else:
-                    with st.spinner("Sending emails..."):
-                        try:
-                            # Create temp directory
-                            temp_cert_dir = tempfile.mkdtemp()
-                            
-                            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_template:
-                                tmp_template.write(st.session_state.template_file.getvalue())
-                                template_path = tmp_template.name
-                            
-                            # Generate certificates
-                            generator = CertificateGenerator(template_path, st.session_state.config)
-                            names = [p['name'] for p in st.session_state.participants_data]
-                            
-                            progress_bar = st.progress(0)
-                            status_text = st.empty()
-                            
-                            # Generate all first
-                            status_text.text("Generating certificates...")
-                            for i, name in enumerate(names):
-                                clean_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in name)
-                                filename = st.session_state.config.get('filename_template', '{name}_Certificate.pdf').format(name=clean_name)
-                                cert_path = os.path.join(temp_cert_dir, filename)
-                                generator.generate_certificate(name, cert_path)
-                                progress_bar.progress((i + 1) / (len(names) * 2))
-                            
-                            # Send emails
-                            email_config = {
-                                'smtp_server': 'smtp.gmail.com',
-                                'smtp_port': 587,
-                                'sender_email': sender_email,
-                                'sender_password': sender_password,
-                                'sender_name': sender_name,
-                                'email_subject': email_subject,
-                                'email_template': email_template
-                            }
-                            
-                            email_sender = EmailSender(email_config)
-                            
-                            status_text.text("Sending emails...")
-                            successful, failed, failed_list = email_sender.send_batch(
-                                st.session_state.participants_data,
-                                temp_cert_dir,
-                                st.session_state.config.get('filename_template', '{name}_Certificate.pdf')
-                            )
-                            
-                            progress_bar.progress(1.0)
-                            
-                            # Cleanup
-                            os.remove(template_path)
-                            shutil.rmtree(temp_cert_dir)
-                            
-                            # Results
-                            if failed == 0:
-                                st.success(f"🎉 Successfully sent {successful} emails!")
-                            else:
-                                st.warning(f"✅ Sent {successful} emails")
-                                st.error(f"❌ Failed to send {failed} emails")
-                                
-                                # Show failed emails
-                                st.write("### ❌ Failed Recipients")
-                                failed_df = pd.DataFrame(failed_list)
-                                st.dataframe(failed_df, use_container_width=True)
-                            
-                            status_text.empty()
-                            progress_bar.empty()
-                            
-                        except Exception as e:
-                            st.error(f"Error: {e}")
-                            st.exception(e)
+            participants = st.session_state.participants_data
+            default_run_id = email_run_id(st.session_state.template_file.getvalue(), participants)
+            run_id = st.text_input(
+                "Run ID",
+                value=default_run_id,
+                key=f"run_id_{default_run_id}",
+                help="Sending again with the same run ID (the default for this template and participant "
+                     "list) skips everyone it already reached. Change it to email everyone again."
+            )
+            
+            email_config = {
+                'smtp_server': 'smtp.gmail.com',
+                'smtp_port': 587,
+                'sender_email': sender_email,
+                'sender_password': sender_password,
+                'sender_name': sender_name,
+                'email_subject': email_subject,
+                'email_template': email_template
+            }
+            
+            col_send, col_resume = st.columns(2)
+            with col_send:
+                send_clicked = st.button("📨 Send All Certificates via Email", type="primary")
+            with col_resume:
+                resume_clicked = st.button("↻ Resume Pending Emails",
+                                           help="Send the emails an interrupted run left pending")
+            
+            if (send_clicked or resume_clicked) and (not sender_email or not sender_password):
+                st.error("❌ Please provide email and password!")
+            elif resume_clicked:
+                with st.spinner("Sending pending emails..."):
+                    try:
+                        instrumentation = new_instrumentation()
+                        email_sender = EmailSender(email_config, instrumentation)
+                        show_email_results(email_sender, *email_sender.resume())
+                        show_instrumentation(instrumentation)
+                    except Exception as e:
+                        st.error(f"Error: {e}")
+                        st.exception(e)
+            elif send_clicked:
+                with st.spinner("Sending emails..."):
+                    try:
+                        # Certificates are written here before they're queued, so the
+                        # run can be resumed after a crash or restart
+                        cert_dir = os.path.join(EMAIL_RUNS_DIR, run_id)
+                        
+                        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_template:
+                            tmp_template.write(st.session_state.template_file.getvalue())
+                            template_path = tmp_template.name
+                        
+                        # Generate certificates
+                        instrumentation = new_instrumentation()
+                        generator = CertificateGenerator(template_path, st.session_state.config, instrumentation)
+                        multi_field = bool(st.session_state.config.get('fields'))
+                        
+                        progress_bar = st.progress(0)
+                        status_text = st.empty()
+                        
+                        email_sender = EmailSender(email_config, instrumentation)
+                        
+                        show_shrunk_names(generator, participants)
+                        
+                        # Each certificate is mailed as soon as it's rendered
+                        status_text.text("Generating and sending certificates...")
+                        with email_sender.pipeline(
+                            participants,
+                            cert_dir,
+                            st.session_state.config.get('filename_template', '{name}_Certificate.pdf'),
+                            run=run_id,
+                            keep_files=True
+                        ) as pipeline:
+                            for i, participant in enumerate(participants, 1):
+                                if pipeline.needs(i):
+                                    pdf_bytes = generator.generate_certificate_bytes(
+                                        participant if multi_field else participant['name']
+                                    )
+                                    pipeline.submit(i, pdf_bytes is not None, pdf_bytes)
+                                progress_bar.progress(i / len(participants))
+                            status_text.text("Finishing email delivery...")
+                        
+                        progress_bar.progress(1.0)
+                        
+                        # Cleanup; the certificates are only needed while emails are pending
+                        os.remove(template_path)
+                        if not email_sender.batch_summary['pending']:
+                            shutil.rmtree(cert_dir, ignore_errors=True)
+                        
+                        show_email_results(email_sender, *pipeline.result)
+                        
+                        status_text.empty()
+                        progress_bar.empty()
+                        show_instrumentation(instrumentation)
+                        
+                    except Exception as e:
+                        st.error(f"Error: {e}")
+                        st.exception(e)
 
         else:
             st.info("👆 Please upload both a template PDF and participants CSV to continue")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Email Benchmark - Measure EmailSender.send_batch throughput against a local SMTP sink
+
+Runs send_batch at several batch sizes against benchmarks/smtp_sink.py with the
+given server latency and failure injection, and reports messages per second,
+p50/p99 send latency, retries and reconnects.
+
+Usage:
+    python benchmarks/bench_email.py [--sizes 100 1000 10000] [--latency-ms 20] [--fail-rate 0.02]
+"""
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from email_sender import EmailSender
+from instrumentation import Instrumentation, percentile
+from smtp_sink import SMTPSink
+
+
+def run(size: int, args, work_dir: str) -> dict:
+    """Send one batch of size recipients against a fresh sink and return its measurements."""
+    certificate_path = os.path.join(work_dir, 'certificate.pdf')
+    participants = [{'name': f"Participant {i}", 'email': f"participant{i}@example.org"}
+                    for i in range(size)]
+    
+    with SMTPSink(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, fail_rate=args.fail_rate,
+                  reject_rate=args.reject_rate, disconnect_rate=args.disconnect_rate) as sink:
+        instrumentation = Instrumentation()
+        sender = EmailSender({
+            'smtp_server': '127.0.0.1',
+            'smtp_port': sink.port,
+            'smtp_use_tls': False,
+            'sender_email': 'bench@example.org',
+            'sender_password': 'bench',
+            'connections': args.connections,
+            'max_per_second': args.max_per_second,
+            'max_attempts': args.max_attempts,
+            'retry_backoff': args.retry_backoff,
+            'outbox_path': os.path.join(work_dir, f'outbox_{size}.db'),
+        }, instrumentation)
+        
+        start = time.perf_counter()
+        # Per-message progress lines would dominate the run; keep them out of the report
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            successful, failed, _ = sender.send_batch(participants, work_dir, os.path.basename(certificate_path))
+        elapsed = time.perf_counter() - start
+    
+    latencies = sorted(instrumentation.timings.get('smtp_send', []))
+    counters = instrumentation.counters
+    return {
+        'size': size,
+        'sent': successful,
+        'failed': failed,
+        'seconds': elapsed,
+        'rate': successful / elapsed,
+        'p50': percentile(latencies, 50) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'retries': counters['email_retries'],
+        'reconnects': counters['smtp_reconnects'],
+        'connections': counters['smtp_connections'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark email sending against a local SMTP sink')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='Batch sizes to run (default: 100 1000 10000)')
+    parser.add_argument('--connections', type=int, default=4, help='Parallel SMTP connections (default: 4)')
+    parser.add_argument('--max-per-second', type=float, help='Sender rate limit (default: none)')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='Sink delay per message (default: 5)')
+    parser.add_argument('--jitter-ms', type=float, default=5.0, help='Sink random extra delay (default: 5)')
+    parser.add_argument('--fail-rate', type=float, default=0.01, help='Share of 451 replies (default: 0.01)')
+    parser.add_argument('--reject-rate', type=float, default=0.0, help='Share of 550 replies (default: 0)')
+    parser.add_argument('--disconnect-rate', type=float, default=0.001,
+                        help='Share of dropped connections (default: 0.001)')
+    parser.add_argument('--max-attempts', type=int, default=5, help='Attempts per message (default: 5)')
+    parser.add_argument('--retry-backoff', type=float, default=0.05,
+                        help='First retry delay in seconds (default: 0.05)')
+    parser.add_argument('--attachment-kb', type=int, default=50, help='Certificate size in KB (default: 50)')
+    args = parser.parse_args()
+    
+    print(f"Sink: {args.latency_ms:g}+{args.jitter_ms:g} ms latency, {args.fail_rate:.1%} temporary failures, "
+          f"{args.reject_rate:.1%} rejections, {args.disconnect_rate:.1%} dropped connections")
+    print(f"Sender: {args.connections} connections, {args.attachment_kb} KB attachment, "
+          f"rate limit {args.max_per_second or 'none'}")
+    print()
+    print(f"{'recipients':>10}{'sent':>8}{'failed':>8}{'seconds':>10}{'msgs/s':>10}"
+          f"{'p50 ms':>10}{'p99 ms':>10}{'retries':>9}{'reconn':>8}{'conns':>7}")
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        with open(os.path.join(work_dir, 'certificate.pdf'), 'wb') as f:
+            f.write(os.urandom(args.attachment_kb * 1024))
+        
+        for size in args.sizes:
+            row = run(size, args, work_dir)
+            print(f"{row['size']:>10}{row['sent']:>8}{row['failed']:>8}{row['seconds']:>10.2f}{row['rate']:>10.1f}"
+                  f"{row['p50']:>10.2f}{row['p99']:>10.2f}{row['retries']:>9}{row['reconnects']:>8}"
+                  f"{row['connections']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Import Benchmark - Measure CLI startup with python -X importtime
+
+Runs main.py (by default with --help) several times, reports the best wall time,
+the total import time and the heaviest top-level imports, and fails if a module
+that should be imported lazily shows up or startup exceeds --max-ms.
+
+Usage:
+    python benchmarks/bench_import.py [--runs 5] [--max-ms 300] [-- main.py arguments]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Heavy modules that --help and argument errors must not import
+LAZY_MODULES = ['pandas', 'pypdf', 'reportlab', 'smtplib', 'certificate_generator', 'email_sender']
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """
+    Parse -X importtime output.
+    
+    Returns:
+        List of (module, self microseconds, cumulative microseconds); nested
+        imports keep their leading spaces in the module name
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        imports.append((module.rstrip()[1:], int(self_us), int(cumulative_us)))
+    return imports
+
+
+def run(cli_args: List[str]) -> Tuple[float, List[Tuple[str, int, int]]]:
+    """Run main.py once under -X importtime; return wall seconds and the parsed imports."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', 'main.py'] + cli_args,
+                            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - start, parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CLI startup and import time')
+    parser.add_argument('--runs', type=int, default=5, help='Runs to take the best of (default: 5)')
+    parser.add_argument('--max-ms', type=float, help='Fail if the best wall time exceeds this many ms')
+    parser.add_argument('--top', type=int, default=10, help='Heaviest top-level imports to list (default: 10)')
+    parser.add_argument('cli_args', nargs=argparse.REMAINDER,
+                        help='Arguments for main.py after "--" (default: --help)')
+    args = parser.parse_args()
+    cli_args = [a for a in args.cli_args if a != '--'] or ['--help']
+    
+    best_wall, imports = min((run(cli_args) for _ in range(args.runs)), key=lambda r: r[0])
+    top_level = [entry for entry in imports if not entry[0].startswith(' ')]
+    total_ms = sum(cumulative for _, _, cumulative in top_level) / 1000
+    
+    print(f"Command: python main.py {' '.join(cli_args)}")
+    print(f"  wall time (best of {args.runs}): {best_wall * 1000:8.1f} ms")
+    print(f"  import time:                  {total_ms:8.1f} ms ({len(imports)} modules)")
+    print(f"\nHeaviest top-level imports:")
+    for module, _, cumulative in sorted(top_level, key=lambda entry: -entry[2])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+    
+    problems = []
+    if cli_args == ['--help']:
+        loaded = {module.strip() for module, _, _ in imports}
+        problems += [f"{module} is imported at startup" for module in LAZY_MODULES if module in loaded]
+    if args.max_ms and best_wall * 1000 > args.max_ms:
+        problems.append(f"startup took {best_wall * 1000:.0f} ms (limit {args.max_ms:g} ms)")
+    if problems:
+        print()
+        for problem in problems:
+            print(f"✗ {problem}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
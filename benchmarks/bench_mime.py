@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+MIME Benchmark - Compare the cached-skeleton MessageFactory with building each
+message through the email package
+
+Usage:
+    python benchmarks/bench_mime.py [certificate.pdf] [--count N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from email_sender import MessageFactory
+
+SENDER_NAME = 'IEEE Student Branch'
+SENDER_EMAIL = 'branch@example.org'
+SUBJECT = 'Your Participation Certificate'
+TEMPLATE = "Dear {name},\n\nThank you for attending the session.\n\nBest regards,\nIEEE Student Branch"
+
+
+def build_with_email_package(email: str, name: str, certificate_path: str) -> bytes:
+    """Build a message the way send_certificate used to: MIME objects plus a disk read."""
+    msg = MIMEMultipart()
+    msg['From'] = f"{SENDER_NAME} <{SENDER_EMAIL}>"
+    msg['To'] = email
+    msg['Subject'] = SUBJECT
+    msg.attach(MIMEText(TEMPLATE.format(name=name), 'plain'))
+    with open(certificate_path, 'rb') as f:
+        attachment = MIMEApplication(f.read(), _subtype='pdf')
+    attachment.add_header('Content-Disposition', 'attachment',
+                          filename=os.path.basename(certificate_path))
+    msg.attach(attachment)
+    return msg.as_bytes()
+
+
+def run(build, count: int) -> float:
+    """Build count messages and return messages per second."""
+    start = time.perf_counter()
+    for i in range(count):
+        build(f"participant{i}@example.org", f"Participant Number {i}")
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark certificate email construction')
+    parser.add_argument('certificate', nargs='?', help='Certificate PDF to attach (default: 200 KB of random bytes)')
+    parser.add_argument('-n', '--count', type=int, default=1000, help='Messages per method (default: 1000)')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        certificate_path = args.certificate
+        if not certificate_path:
+            certificate_path = os.path.join(tmp_dir, 'certificate.pdf')
+            with open(certificate_path, 'wb') as f:
+                f.write(os.urandom(200 * 1024))
+        
+        with open(certificate_path, 'rb') as f:
+            pdf = f.read()
+        filename = os.path.basename(certificate_path)
+        factory = MessageFactory(SENDER_NAME, SENDER_EMAIL, SUBJECT, TEMPLATE)
+        
+        package_rate = run(lambda email, name: build_with_email_package(email, name, certificate_path), args.count)
+        factory_rate = run(lambda email, name: factory.build(email, name, pdf, filename), args.count)
+    
+    print(f"Messages: {args.count} (attachment {len(pdf) / 1024:.0f} KB)")
+    print(f"  email package:   {package_rate:8.1f} messages/s")
+    print(f"  MessageFactory:  {factory_rate:8.1f} messages/s")
+    print(f"  speedup:         {factory_rate / package_rate:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
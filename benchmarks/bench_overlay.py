@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Overlay Benchmark - Compare the fast text-operator overlay with the reportlab overlay
+
+Usage:
+    python benchmarks/bench_overlay.py [template.pdf] [--count N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from certificate_generator import CertificateGenerator
+from reportlab.pdfgen import canvas
+
+
+def make_template(path: str):
+    """Write a simple landscape A4 template for benchmarking."""
+    can = canvas.Canvas(path, pagesize=(842, 595))
+    can.setFont('Times-Roman', 40)
+    can.drawCentredString(421, 450, 'CERTIFICATE OF PARTICIPATION')
+    can.rect(30, 30, 782, 535)
+    can.save()
+
+
+def run(template_path: str, config: dict, names: list, output_dir: str) -> float:
+    """Generate one certificate per name and return certificates per second."""
+    generator = CertificateGenerator(template_path, config)
+    start = time.perf_counter()
+    for i, name in enumerate(names):
+        generator.generate_certificate(name, os.path.join(output_dir, f"{i}.pdf"))
+    return len(names) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark certificate overlay engines')
+    parser.add_argument('template', nargs='?', help='Certificate template PDF (default: generated)')
+    parser.add_argument('-n', '--count', type=int, default=500, help='Certificates per engine (default: 500)')
+    args = parser.parse_args()
+    
+    names = [f"Participant Number {i}" for i in range(args.count)]
+    config = {'x_position': 421, 'y_position': 268, 'font_name': 'Helvetica-Bold', 'font_size': 36}
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        template_path = args.template
+        if not template_path:
+            template_path = os.path.join(tmp_dir, 'template.pdf')
+            make_template(template_path)
+        
+        reportlab_rate = run(template_path, dict(config, fast_overlay=False), names, tmp_dir)
+        fast_rate = run(template_path, dict(config, fast_overlay=True), names, tmp_dir)
+    
+    print(f"Certificates: {args.count}")
+    print(f"  reportlab overlay: {reportlab_rate:8.1f} certificates/s")
+    print(f"  fast overlay:      {fast_rate:8.1f} certificates/s")
+    print(f"  speedup:           {fast_rate / reportlab_rate:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+SMTP Sink - A local stand-in for the mail server, with latency and failure injection
+
+Accepts (and discards) every message, answers AUTH PLAIN with success and
+doesn't offer STARTTLS, so point the sender at it with "smtp_use_tls": false.
+
+Usage:
+    python benchmarks/smtp_sink.py [--port 8025] [--latency-ms 20] [--fail-rate 0.05]
+"""
+import argparse
+import random
+import socketserver
+import threading
+import time
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    """Threaded TCP server that doesn't wait for open sessions on shutdown."""
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """One SMTP session."""
+    
+    def reply(self, line: str):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+    
+    def handle(self):
+        sink = self.server.sink
+        with sink.lock:
+            sink.connections += 1
+        self.reply('220 localhost SMTP sink ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b'EHLO':
+                self.wfile.write(b'250-localhost\r\n250-AUTH PLAIN\r\n250 8BITMIME\r\n')
+            elif command in (b'HELO', b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                self.reply('250 OK')
+            elif command == b'AUTH':
+                self.reply('235 Authentication successful')
+            elif command == b'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                outcome = sink.outcome()
+                if outcome == 'disconnect':
+                    return
+                self.reply(outcome)
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPSink:
+    """
+    Threaded SMTP server on localhost for benchmarks and offline testing.
+    
+    Every message waits latency_ms (plus up to jitter_ms) before the reply, then
+    is accepted, rejected with a temporary 451, rejected permanently with 550, or
+    has its connection dropped, with the given probabilities.
+    """
+    
+    def __init__(self, port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 fail_rate: float = 0.0, reject_rate: float = 0.0, disconnect_rate: float = 0.0,
+                 seed: int = 0):
+        """
+        Args:
+            port: Port to listen on (0 = any free port; see self.port)
+            latency_ms: Delay before answering each message
+            jitter_ms: Extra random delay, uniform in [0, jitter_ms]
+            fail_rate: Probability of a temporary 451 rejection
+            reject_rate: Probability of a permanent 550 rejection
+            disconnect_rate: Probability of dropping the connection instead of answering
+            seed: Random seed, so runs are repeatable
+        """
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.fail_rate = fail_rate
+        self.reject_rate = reject_rate
+        self.disconnect_rate = disconnect_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.accepted = 0
+        self.failed = 0
+        self.rejected = 0
+        self.dropped = 0
+        
+        self.server = SinkServer(('127.0.0.1', port), SinkHandler)
+        self.server.sink = self
+        self.port = self.server.server_address[1]
+    
+    def outcome(self) -> str:
+        """Wait out the latency, then pick the reply for one message ('disconnect' = drop)."""
+        with self.lock:
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            roll = self.random.random()
+        time.sleep(delay)
+        with self.lock:
+            if roll < self.disconnect_rate:
+                self.dropped += 1
+                return 'disconnect'
+            roll -= self.disconnect_rate
+            if roll < self.fail_rate:
+                self.failed += 1
+                return '451 Temporary failure, try again later'
+            roll -= self.fail_rate
+            if roll < self.reject_rate:
+                self.rejected += 1
+                return '550 Mailbox unavailable'
+            self.accepted += 1
+            return '250 OK: queued'
+    
+    def start(self):
+        """Serve in a background thread."""
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+    
+    def stop(self):
+        """Shut the server down."""
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local SMTP sink')
+    parser.add_argument('--port', type=int, default=8025, help='Port to listen on (default: 8025)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Delay per message (default: 0)')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Random extra delay per message (default: 0)')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of messages answered 451 (default: 0)')
+    parser.add_argument('--reject-rate', type=float, default=0.0, help='Share of messages answered 550 (default: 0)')
+    parser.add_argument('--disconnect-rate', type=float, default=0.0,
+                        help='Share of messages whose connection is dropped (default: 0)')
+    args = parser.parse_args()
+    
+    sink = SMTPSink(args.port, args.latency_ms, args.jitter_ms, args.fail_rate,
+                    args.reject_rate, args.disconnect_rate)
+    print(f"SMTP sink listening on 127.0.0.1:{sink.port} (Ctrl+C to stop)")
+    print(f'Use "smtp_server": "127.0.0.1", "smtp_port": {sink.port}, "smtp_use_tls": false')
+    try:
+        sink.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.server.server_close()
+        print(f"\naccepted {sink.accepted}, temporary failures {sink.failed}, "
+              f"rejected {sink.rejected}, dropped {sink.dropped}, connections {sink.connections}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,44 +1,293 @@
 """
 Certificate Generator - Overlay participant names on PDF certificates
 """
+import hashlib
+import json
+import multiprocessing
 import os
+import time
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, List, NamedTuple, Optional, Tuple, Union
 from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (ArrayObject, DecodedStreamObject, DictionaryObject, NameObject,
+                           NumberObject, StreamObject)
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.colors import HexColor
 from io import BytesIO
+from instrumentation import Instrumentation, NO_INSTRUMENTATION
+
+
+# Incremental batches keep a {filename: render hash} manifest in the output directory
+MANIFEST_FILENAME = '.certificates_manifest.json'
+MANIFEST_SAVE_EVERY = 50
+
+# Config keys that change how a certificate looks (part of the manifest hash)
+RENDER_CONFIG_KEYS = (
+    'x_position', 'y_position', 'font_name', 'font_size', 'font_color',
+    'alignment', 'custom_font_path', 'max_text_width', 'min_font_size', 'fields',
+)
+
+
+# Per-process font registry: (font path, mtime) -> registered reportlab font name
+_registered_fonts = {}
+
+
+def register_font(font_path: str) -> str:
+    """
+    Register a TTF font with reportlab, parsing each font file only once per process.
+    
+    Args:
+        font_path: Path to the TTF font file
+        
+    Returns:
+        The reportlab font name to use with setFont
+    """
+    key = (os.path.abspath(font_path), os.path.getmtime(font_path))
+    font_name = _registered_fonts.get(key)
+    if font_name is None:
+        font_name = f"CustomFont{len(_registered_fonts)}"
+        pdfmetrics.registerFont(TTFont(font_name, font_path))
+        _registered_fonts[key] = font_name
+    return font_name
+
+
+class WidthTable:
+    """Per-character advance widths of one font, measured once at 1pt."""
+    
+    def __init__(self, font_name: str):
+        """
+        Precompute widths for the Latin-1 range of a registered font.
+        
+        Args:
+            font_name: reportlab font name (standard or registered TTF)
+        """
+        self.font_name = font_name
+        self.widths = {chr(c): pdfmetrics.stringWidth(chr(c), font_name, 1) for c in range(32, 256)}
+    
+    def measure(self, text: str, font_size: float) -> float:
+        """Width of text at font_size, filling in characters outside the table on first use."""
+        widths = self.widths
+        total = 0.0
+        for c in text:
+            w = widths.get(c)
+            if w is None:
+                w = widths[c] = pdfmetrics.stringWidth(c, self.font_name, 1)
+            total += w
+        return total * font_size
+
+
+@lru_cache(maxsize=None)
+def width_table(font_name: str) -> WidthTable:
+    """Get the (per-process, built once) width table for a font."""
+    return WidthTable(font_name)
+
+
+@lru_cache(maxsize=8192)
+def text_width(text: str, font_name: str, font_size: float) -> float:
+    """Memoized string width lookup backed by the font's width table."""
+    return width_table(font_name).measure(text, font_size)
+
+
+class TemplateCache:
+    """Parse a PDF template once and hand out independent copies of its first page."""
+    
+    def __init__(self, template_path: str):
+        """
+        Load and parse the template.
+        
+        Args:
+            template_path: Path to the PDF certificate template
+        """
+        self.template_path = template_path
+        
+        # Keep the raw bytes around so the file is only read from disk once
+        with open(template_path, 'rb') as f:
+            self.data = f.read()
+        self.reader = PdfReader(BytesIO(self.data))
+        self.page = self.reader.pages[0]
+    
+    def form_xobject(self, writer: PdfWriter) -> StreamObject:
+        """
+        Build a Form XObject of the template page for use inside a writer.
+        
+        Args:
+            writer: The PdfWriter the XObject will be added to
+            
+        Returns:
+            Compressed Form XObject stream whose resources live in the writer
+        """
+        contents = self.page.get_contents()
+        xobject = DecodedStreamObject()
+        xobject.set_data(contents.get_data() if contents is not None else b"")
+        xobject[NameObject('/Type')] = NameObject('/XObject')
+        xobject[NameObject('/Subtype')] = NameObject('/Form')
+        xobject[NameObject('/BBox')] = self.page.mediabox
+        resources = self.page.get('/Resources')
+        if resources is not None:
+            xobject[NameObject('/Resources')] = resources.clone(writer)
+        return xobject.flate_encode()
+    
+    def new_page(self, writer: PdfWriter):
+        """
+        Add a fresh copy of the template page to a writer.
+        
+        The page is cloned into the writer, so merging text onto the returned
+        page never touches the cached template and names don't accumulate
+        across certificates.
+        
+        Args:
+            writer: The PdfWriter the certificate is being built in
+            
+        Returns:
+            The writer's copy of the template page
+        """
+        return writer.add_page(self.page)
+
+
+class RenderSlot(NamedTuple):
+    """One text field of a compiled render plan, with its style fully resolved."""
+    key: str
+    font_name: str
+    font_size: float
+    min_font_size: float
+    max_text_width: Optional[float]
+    color: str
+    rgb: Tuple[float, float, float]
+    x: float
+    y: float
+    alignment: str
+    pdf_font: Optional[str]
+
+
+# A render plan is an immutable tuple of slots, compiled once per generator
+RenderPlan = Tuple[RenderSlot, ...]
 
 
 class CertificateGenerator:
     """Generate personalized certificates by overlaying names on a PDF template."""
     
-    def __init__(self, template_path: str, config: dict):
+    def __init__(self, template_path: str, config: dict, instrumentation=None):
         """
         Initialize the certificate generator.
         
         Args:
             template_path: Path to the PDF certificate template
             config: Configuration dictionary with positioning and styling
+            instrumentation: Optional Instrumentation to record per-stage timings in
         """
         self.template_path = template_path
         self.config = config
-        self.template = PdfReader(template_path)
+        self.instrumentation = instrumentation or NO_INSTRUMENTATION
+        self.template_cache = TemplateCache(template_path)
+        self.template = self.template_cache.reader
         
         # Get template dimensions
         page = self.template.pages[0]
         self.page_width = float(page.mediabox.width)
         self.page_height = float(page.mediabox.height)
         
-    def create_text_overlay(self, text: str) -> BytesIO:
+        self.plan = self.compile_plan()
+        
+        # Fast overlay path: standard PDF fonts can be drawn with raw text operators,
+        # so the font resources are built once here and reused for every certificate
+        self.fast_fonts = None
+        if self.config.get('fast_overlay', True) and all(slot.pdf_font for slot in self.plan):
+            self.fast_fonts = {
+                NameObject(slot.pdf_font): DictionaryObject({
+                    NameObject('/Type'): NameObject('/Font'),
+                    NameObject('/Subtype'): NameObject('/Type1'),
+                    NameObject('/BaseFont'): NameObject('/' + slot.font_name),
+                    NameObject('/Encoding'): NameObject('/WinAnsiEncoding'),
+                })
+                for slot in self.plan
+            }
+    
+    def compile_plan(self) -> RenderPlan:
+        """
+        Compile the text layout in the config into an immutable render plan.
+        
+        A config with a 'fields' list gets one slot per field; each field can set
+        its own x_position, y_position, font_name, font_size, font_color, alignment,
+        custom_font_path and max_text_width, falling back to the top-level values.
+        Without 'fields' the plan is a single 'name' slot from the top-level values.
+        
+        Returns:
+            Tuple of RenderSlot, in drawing order
+        """
+        fields = self.config.get('fields') or [{'key': 'name'}]
+        plan = []
+        
+        for field in fields:
+            def setting(key, default=None):
+                return field.get(key, self.config.get(key, default))
+            
+            font_name = setting('font_name', 'Helvetica-Bold')
+            pdf_font = None
+            custom_font_path = setting('custom_font_path')
+            if custom_font_path and os.path.exists(custom_font_path):
+                try:
+                    font_name = register_font(custom_font_path)
+                except Exception as e:
+                    print(f"Warning: Could not load custom font. Using {font_name}. Error: {e}")
+            if font_name in pdfmetrics.standardFonts:
+                pdf_font = f"/CertF{len(plan)}"
+            
+            color = setting('font_color', '#000000')
+            font_size = setting('font_size', 36)
+            plan.append(RenderSlot(
+                key=field.get('key', field.get('id', 'name')),
+                font_name=font_name,
+                font_size=font_size,
+                # A field set smaller than the inherited minimum isn't "shrunk" at its own size
+                min_font_size=min(setting('min_font_size', 12), font_size),
+                max_text_width=setting('max_text_width') or None,
+                color=color,
+                rgb=HexColor(color).rgb(),
+                x=setting('x_position', self.page_width / 2),
+                y=setting('y_position', self.page_height / 2),
+                alignment=setting('alignment', 'center'),
+                pdf_font=pdf_font,
+            ))
+        
+        return tuple(plan)
+    
+    @staticmethod
+    def as_row(participant: Union[str, dict]) -> dict:
+        """Turn a bare name into a row dict; rows pass through unchanged."""
+        if isinstance(participant, dict):
+            return participant
+        return {'name': participant}
+    
+    def row_values(self, participant: Union[str, dict]) -> List[Tuple[RenderSlot, str]]:
+        """
+        Substitute a participant's values into the render plan.
+        
+        Args:
+            participant: Participant name or row dict
+            
+        Returns:
+            List of (slot, text) pairs for the slots that have a value
+        """
+        row = self.as_row(participant)
+        values = []
+        for slot in self.plan:
+            value = row.get(slot.key)
+            if value is None or value == '':
+                continue
+            values.append((slot, str(value)))
+        return values
+    
+    def create_text_overlay(self, participant: Union[str, dict]) -> BytesIO:
         """
         Create a transparent PDF with just the text overlay.
         
         Args:
-            text: The text to overlay (participant name)
+            participant: The participant name (or row dict) to overlay
             
         Returns:
             BytesIO object containing the overlay PDF
@@ -47,118 +296,489 @@ class CertificateGenerator:
         
         # Create canvas with same dimensions as template
         can = canvas.Canvas(packet, pagesize=(self.page_width, self.page_height))
+        self._draw_text(can, participant)
+        can.save()
+        packet.seek(0)
+        return packet
+    
+    def _draw_text(self, can: canvas.Canvas, participant: Union[str, dict]):
+        """
+        Draw a participant's fields onto a canvas using the render plan.
+        
+        Args:
+            can: reportlab canvas to draw on
+            participant: Participant name or row dict
+        """
+        for slot, text in self.row_values(participant):
+            font_size, x = self.layout_text(slot, text)
+            can.setFont(slot.font_name, font_size)
+            can.setFillColor(HexColor(slot.color))
+            can.drawString(x, slot.y, text)
+    
+    def layout_text(self, slot: RenderSlot, text: str) -> Tuple[float, float]:
+        """
+        Work out the font size and baseline start x for a value in a slot.
         
-        # Set font
-        font_name = self.config.get('font_name', 'Helvetica-Bold')
-        font_size = self.config.get('font_size', 36)
+        Applies auto-fit to max_text_width and the slot's alignment.
         
-        # Try to use custom font if specified
-        custom_font_path = self.config.get('custom_font_path')
-        if custom_font_path and os.path.exists(custom_font_path):
-            try:
-                pdfmetrics.registerFont(TTFont('CustomFont', custom_font_path))
-                font_name = 'CustomFont'
-            except Exception as e:
-                print(f"Warning: Could not load custom font. Using {font_name}. Error: {e}")
+        Args:
+            slot: The render slot the text is drawn in
+            text: The text to draw
+            
+        Returns:
+            Tuple of (font_size, x)
+        """
+        font_size = self.fit_font_size(slot, text)
+        x = slot.x
         
-        can.setFont(font_name, font_size)
+        # Shift the start position based on alignment
+        if slot.alignment == 'center':
+            x -= text_width(text, slot.font_name, font_size) / 2
+        elif slot.alignment == 'right':
+            x -= text_width(text, slot.font_name, font_size)
+        return font_size, x
+    
+    def fit_font_size(self, slot: RenderSlot, text: str) -> float:
+        """
+        Get the font size for text, shrunk if needed to fit within max_text_width.
+        
+        Width scales linearly with size, so one width-table lookup gives the fitted
+        size directly without a measuring loop.
+        
+        Args:
+            slot: The render slot the text is drawn in
+            text: The text to draw
+            
+        Returns:
+            The slot's font_size, or a smaller size that fits max_text_width
+        """
+        if not slot.max_text_width:
+            return slot.font_size
+        width = text_width(text, slot.font_name, slot.font_size)
+        if width <= slot.max_text_width:
+            return slot.font_size
+        return slot.font_size * slot.max_text_width / width
+    
+    def check_fit(self, participants: List[Union[str, dict]]) -> List[Tuple[str, float]]:
+        """
+        Find values that have to be shrunk below min_font_size to fit max_text_width.
+        
+        Args:
+            participants: List of participant names or row dicts
+            
+        Returns:
+            List of (text, fitted_font_size) for values below their slot's minimum size
+        """
+        if not any(slot.max_text_width for slot in self.plan):
+            return []
+        too_small = []
+        for participant in participants:
+            for slot, text in self.row_values(participant):
+                font_size = self.fit_font_size(slot, text)
+                if font_size < slot.font_size and font_size < slot.min_font_size:
+                    too_small.append((text, font_size))
+        return too_small
+    
+    def add_text_fast(self, page, writer: PdfWriter, participant: Union[str, dict]) -> bool:
+        """
+        Draw text onto a template page copy by appending PDF text operators directly.
         
-        # Set color
-        color = self.config.get('font_color', '#000000')
-        can.setFillColor(HexColor(color))
+        This skips the reportlab canvas / PdfReader / merge_page round trip. It only
+        handles standard PDF fonts and text that fits WinAnsiEncoding; callers should
+        fall back to create_text_overlay when it returns False.
         
-        # Get position
-        x = self.config.get('x_position', self.page_width / 2)
-        y = self.config.get('y_position', self.page_height / 2)
+        Args:
+            page: The writer's copy of the template page
+            writer: The PdfWriter that owns the page
+            participant: Participant name or row dict
+            
+        Returns:
+            True if the text was drawn, False if the fast path can't handle it
+        """
+        if self.fast_fonts is None:
+            return False
         
-        # Get alignment
-        alignment = self.config.get('alignment', 'center')
+        operators = [b"\nQ\n"]
+        for slot, text in self.row_values(participant):
+            try:
+                encoded = text.encode('cp1252')
+            except UnicodeEncodeError:
+                return False
+            
+            font_size, x = self.layout_text(slot, text)
+            escaped = encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+            operators.append(
+                b"q %.4f %.4f %.4f rg BT %s %.2f Tf %.2f %.2f Td (%s) Tj ET Q\n"
+                % (*slot.rgb, slot.pdf_font.encode(), font_size, x, slot.y, escaped)
+            )
+        overlay = DecodedStreamObject()
+        overlay.set_data(b"".join(operators))
         
-        # Draw text based on alignment
-        if alignment == 'center':
-            can.drawCentredString(x, y, text)
-        elif alignment == 'right':
-            can.drawRightString(x, y, text)
-        else:  # left
-            can.drawString(x, y, text)
+        # Register the shared fonts under names that can't clash with the template's fonts
+        resources = page.setdefault(NameObject('/Resources'), DictionaryObject()).get_object()
+        fonts = resources.setdefault(NameObject('/Font'), DictionaryObject()).get_object()
+        fonts.update(self.fast_fonts)
         
-        can.save()
-        packet.seek(0)
-        return packet
+        # Wrap the template content in q ... Q so its graphics state can't leak into the text
+        opening = DecodedStreamObject()
+        opening.set_data(b"q\n")
+        contents = page.get('/Contents')
+        if contents is None:
+            existing = []
+        elif isinstance(contents.get_object(), ArrayObject):
+            existing = list(contents.get_object())
+        else:
+            existing = [contents]
+        page[NameObject('/Contents')] = ArrayObject(
+            [writer._add_object(opening)] + existing + [writer._add_object(overlay)]
+        )
+        return True
     
-    def generate_certificate(self, name: str, output_path: str) -> bool:
+    def generate_certificate_bytes(self, participant: Union[str, dict]) -> Optional[bytes]:
         """
-        Generate a certificate for a single participant.
+        Generate a certificate for a single participant in memory.
         
         Args:
-            name: Participant's name
-            output_path: Where to save the generated certificate
+            participant: Participant's name, or a row dict for multi-field layouts
             
         Returns:
-            True if successful, False otherwise
+            The certificate PDF as bytes, or None if generation failed
         """
+        instrumentation = self.instrumentation
         try:
-            # Create text overlay
-            overlay_pdf = self.create_text_overlay(name)
-            overlay = PdfReader(overlay_pdf)
-            
             # Create output PDF
             output = PdfWriter()
             
-            # Read a fresh copy of the template page (important: don't reuse the same page object!)
-            # This prevents names from accumulating on subsequent certificates
-            template = PdfReader(self.template_path)
-            page = template.pages[0]
+            # Take a fresh copy of the cached template page (important: don't merge onto
+            # the cached page itself!) so names don't accumulate on later certificates
+            with instrumentation.stage('template_copy'):
+                page = self.template_cache.new_page(output)
             
-            # Merge overlay onto template
-            page.merge_page(overlay.pages[0])
-            output.add_page(page)
+            with instrumentation.stage('overlay'):
+                drawn = self.add_text_fast(page, output, participant)
+                if not drawn:
+                    # Fall back to a reportlab overlay (custom fonts, non-Latin text)
+                    overlay = PdfReader(self.create_text_overlay(participant))
+            if not drawn:
+                with instrumentation.stage('merge'):
+                    page.merge_page(overlay.pages[0])
             
+            with instrumentation.stage('pdf_write'):
+                buffer = BytesIO()
+                output.write(buffer)
+            instrumentation.count('certificates_generated')
+            return buffer.getvalue()
+            
+        except Exception as e:
+            instrumentation.count('certificates_failed')
+            print(f"Error generating certificate for {self.display_name(participant)}: {e}")
+            return None
+    
+    def generate_certificate(self, participant: Union[str, dict], output_path: str) -> bool:
+        """
+        Generate a certificate for a single participant.
+        
+        Args:
+            participant: Participant's name, or a row dict for multi-field layouts
+            output_path: Where to save the generated certificate
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        data = self.generate_certificate_bytes(participant)
+        if data is None:
+            return False
+        
+        try:
             # Write to file
-            with open(output_path, 'wb') as output_file:
-                output.write(output_file)
+            with self.instrumentation.stage('file_write'):
+                with open(output_path, 'wb') as output_file:
+                    output_file.write(data)
+            self.instrumentation.count('bytes_written', len(data))
             
             return True
             
         except Exception as e:
-            print(f"Error generating certificate for {name}: {e}")
+            print(f"Error generating certificate for {self.display_name(participant)}: {e}")
             return False
     
-    def generate_batch(self, names: List[str], output_dir: str, 
-                       filename_template: str = "{name}_certificate.pdf") -> Tuple[int, int]:
+    def generate_batch(self, names: List[Union[str, dict]], output_dir: str, 
+                       filename_template: str = "{name}_certificate.pdf",
+                       jobs: int = 1, incremental: bool = True,
+                       on_certificate: Optional[Callable[[int, bool], None]] = None) -> Tuple[int, int]:
         """
         Generate certificates for multiple participants.
         
+        With incremental=True a manifest in output_dir records a hash of the template,
+        render settings and name for every certificate, so a rerun only regenerates
+        certificates that are missing or whose inputs changed.
+        
         Args:
-            names: List of participant names
+            names: List of participant names, or row dicts (with a 'name' key) for
+                multi-field layouts
             output_dir: Directory to save certificates
             filename_template: Template for output filenames (use {name} placeholder)
+            jobs: Number of worker processes (1 = generate in this process, 0 = one per CPU core)
+            incremental: Skip certificates that are already up to date
+            on_certificate: Called with (index, ok) as soon as each certificate is on
+                disk (index is the 1-based position in names), e.g. to start mailing
+                it right away; up-to-date certificates are reported while scanning
             
         Returns:
-            Tuple of (successful_count, failed_count)
+            Tuple of (successful_count, failed_count); up-to-date certificates count as successful
         """
         # Create output directory if it doesn't exist
         Path(output_dir).mkdir(parents=True, exist_ok=True)
         
-        successful = 0
-        failed = 0
+        self.shrunk_names = self.check_fit(names)
+        if self.shrunk_names:
+            print(f"Warning: {len(self.shrunk_names)} values had to be shrunk below the minimum font size to fit:")
+            for name, size in self.shrunk_names:
+                print(f"  {name}: {size:.1f}pt")
         
-        for i, name in enumerate(names, 1):
+        manifest = self.load_manifest(output_dir) if incremental else {}
+        
+        tasks = []
+        skipped = 0
+        for i, participant in enumerate(names, 1):
             # Clean name for filename
+            name = self.display_name(participant)
             clean_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in name)
             filename = filename_template.format(name=clean_name, index=i)
             output_path = os.path.join(output_dir, filename)
             
-            print(f"Generating certificate {i}/{len(names)}: {name}")
-            
-            if self.generate_certificate(name, output_path):
+            if incremental and manifest.get(os.path.relpath(output_path, output_dir)) == self.render_hash(participant) \
+                    and os.path.exists(output_path):
+                skipped += 1
+                if on_certificate:
+                    on_certificate(i, True)
+                continue
+            tasks.append((i, participant, output_path))
+        
+        if skipped:
+            print(f"Skipping {skipped} certificates that are already up to date")
+        
+        successful = 0
+        failed = 0
+        
+        def record(i: int, participant: Union[str, dict], output_path: str, ok: bool):
+            nonlocal successful, failed
+            if on_certificate:
+                on_certificate(i, ok)
+            if ok:
                 successful += 1
-                print(f"  ✓ Saved to {output_path}")
+                manifest[os.path.relpath(output_path, output_dir)] = self.render_hash(participant)
+                # Save now and then so an interrupted batch can resume where it stopped
+                if incremental and successful % MANIFEST_SAVE_EVERY == 0:
+                    self.save_manifest(output_dir, manifest)
             else:
                 failed += 1
-                print(f"  ✗ Failed")
         
-        return successful, failed
+        if jobs == 0:
+            jobs = os.cpu_count() or 1
+        if jobs > 1 and len(tasks) > 1:
+            self._generate_batch_parallel(tasks, jobs, record)
+        else:
+            for i, participant, output_path in tasks:
+                print(f"Generating certificate {i}/{len(names)}: {self.display_name(participant)}")
+                
+                ok = self.generate_certificate(participant, output_path)
+                record(i, participant, output_path, ok)
+                if ok:
+                    print(f"  ✓ Saved to {output_path}")
+                else:
+                    print(f"  ✗ Failed")
+        
+        if incremental:
+            self.save_manifest(output_dir, manifest)
+        
+        self.batch_summary = {'skipped': skipped, 'rebuilt': successful, 'failed': failed}
+        return successful + skipped, failed
+    
+    def display_name(self, participant: Union[str, dict]) -> str:
+        """Get the participant name used for filenames and progress output."""
+        return str(self.as_row(participant).get('name', ''))
+    
+    def render_hash(self, participant: Union[str, dict]) -> str:
+        """
+        Hash everything that determines a certificate's content.
+        
+        Args:
+            participant: Participant's name or row dict
+            
+        Returns:
+            Hex digest of (template bytes, render settings, rendered values)
+        """
+        if not hasattr(self, '_render_key'):
+            render_config = {key: self.config.get(key) for key in RENDER_CONFIG_KEYS}
+            for i, field in enumerate([self.config] + list(self.config.get('fields') or [])):
+                font_path = field.get('custom_font_path')
+                if font_path and os.path.exists(font_path):
+                    render_config[f'custom_font_mtime_{i}'] = os.path.getmtime(font_path)
+            template_hash = hashlib.sha256(self.template_cache.data).hexdigest()
+            self._render_key = template_hash + json.dumps(render_config, sort_keys=True, default=str)
+        row = self.as_row(participant)
+        values = '\0'.join(str(row.get(slot.key, '')) for slot in self.plan)
+        return hashlib.sha256((self._render_key + '\0' + values).encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def load_manifest(output_dir: str) -> dict:
+        """Load the {filename: render hash} manifest from an output directory."""
+        manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r') as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError):
+                return {}
+        return {}
+    
+    @staticmethod
+    def save_manifest(output_dir: str, manifest: dict):
+        """Atomically write the {filename: render hash} manifest to an output directory."""
+        manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+    
+    def _generate_batch_parallel(self, tasks: List[Tuple[int, Union[str, dict], str]], jobs: int,
+                                 record: Callable[[int, Union[str, dict], str, bool], None]):
+        """
+        Spread certificate generation over a pool of worker processes.
+        
+        Each worker builds its own CertificateGenerator once, so the template and
+        fonts stay warm for every name it renders. Per-worker throughput is printed
+        at the end and kept in self.worker_stats.
+        
+        Args:
+            tasks: List of (index, participant, output_path) tuples
+            jobs: Number of worker processes
+            record: Called with (index, participant, output_path, ok) for every finished certificate
+        """
+        jobs = min(jobs, len(tasks))
+        # A few chunks per worker keeps the pool balanced without paying IPC per name
+        chunk_size = max(1, len(tasks) // (jobs * 4))
+        chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+        
+        done = 0
+        self.worker_stats = {}
+        
+        print(f"Generating {len(tasks)} certificates with {jobs} worker processes...")
+        start = time.perf_counter()
+        
+        # Spawn rather than fork: the caller may already run threads (e.g. the email
+        # pipeline's SMTP senders) whose held locks a forked child would inherit
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker,
+                                 initargs=(self.template_path, self.config,
+                                           self.instrumentation.enabled)) as pool:
+            futures = [pool.submit(_generate_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                pid, elapsed, results, timings = future.result()
+                self.instrumentation.merge(timings)
+                stats = self.worker_stats.setdefault(pid, {'certificates': 0, 'seconds': 0.0})
+                stats['certificates'] += len(results)
+                stats['seconds'] += elapsed
+                
+                for i, participant, output_path, ok in results:
+                    done += 1
+                    name = self.display_name(participant)
+                    record(i, participant, output_path, ok)
+                    if ok:
+                        print(f"  ✓ [{done}/{len(tasks)}] {name} -> {output_path}")
+                    else:
+                        print(f"  ✗ [{done}/{len(tasks)}] {name} failed")
+        
+        total = time.perf_counter() - start
+        print(f"\nWorker throughput ({total:.2f}s wall, {len(tasks) / total:.1f} certificates/s overall):")
+        for pid, stats in sorted(self.worker_stats.items()):
+            rate = stats['certificates'] / stats['seconds'] if stats['seconds'] else 0.0
+            print(f"  worker {pid}: {stats['certificates']} certificates in {stats['seconds']:.2f}s ({rate:.1f}/s)")
+    
+    def generate_combined(self, names: List[Union[str, dict]], output_path: str) -> Tuple[int, int]:
+        """
+        Generate one multi-page PDF with a certificate page for every participant.
+        
+        The template page is stored once as a shared Form XObject and every page
+        just draws it and adds its own small text stream, so the file grows by a
+        few KB per name instead of a full template copy.
+        
+        Args:
+            names: List of participant names or row dicts
+            output_path: Where to save the combined PDF
+            
+        Returns:
+            Tuple of (successful_count, failed_count)
+        """
+        if not names:
+            return 0, 0
+        
+        try:
+            # Render every name into one overlay document so fonts are embedded once
+            packet = BytesIO()
+            can = canvas.Canvas(packet, pagesize=(self.page_width, self.page_height))
+            for participant in names:
+                self._draw_text(can, participant)
+                can.showPage()
+            can.save()
+            packet.seek(0)
+            overlay = PdfReader(packet)
+            
+            output = PdfWriter()
+            template_page = self.template_cache.page
+            template_ref = output._add_object(self.template_cache.form_xobject(output))
+            
+            # Shared "draw the template" prefix, referenced by every page
+            prefix = DecodedStreamObject()
+            prefix.set_data(b"q /CertTemplate Do Q\n")
+            prefix_ref = output._add_object(prefix)
+            
+            for overlay_page in overlay.pages:
+                page = output.add_page(overlay_page)
+                page[NameObject('/MediaBox')] = template_page.mediabox
+                if '/Rotate' in template_page:
+                    page[NameObject('/Rotate')] = NumberObject(template_page['/Rotate'])
+                
+                resources = page.setdefault(NameObject('/Resources'), DictionaryObject()).get_object()
+                xobjects = resources.setdefault(NameObject('/XObject'), DictionaryObject()).get_object()
+                xobjects[NameObject('/CertTemplate')] = template_ref
+                
+                contents = page.get('/Contents')
+                if contents is None:
+                    page[NameObject('/Contents')] = ArrayObject([prefix_ref])
+                elif isinstance(contents.get_object(), ArrayObject):
+                    page[NameObject('/Contents')] = ArrayObject([prefix_ref] + list(contents.get_object()))
+                else:
+                    page[NameObject('/Contents')] = ArrayObject([prefix_ref, contents])
+            
+            with open(output_path, 'wb') as output_file:
+                output.write(output_file)
+            
+            return len(names), 0
+            
+        except Exception as e:
+            print(f"Error generating combined certificates: {e}")
+            return 0, len(names)
+
+
+# Per-process generator used by the parallel batch workers
+_worker_generator = None
+
+
+def _init_worker(template_path: str, config: dict, instrumented: bool = False):
+    """Build the worker's generator once so its template and fonts stay warm."""
+    global _worker_generator
+    _worker_generator = CertificateGenerator(template_path, config,
+                                             Instrumentation() if instrumented else None)
+
+
+def _generate_chunk(tasks: List[Tuple[int, Union[str, dict], str]]) -> tuple:
+    """Render a chunk of (index, participant, output_path) tasks in a worker process."""
+    start = time.perf_counter()
+    results = [(i, participant, output_path, _worker_generator.generate_certificate(participant, output_path))
+               for i, participant, output_path in tasks]
+    return os.getpid(), time.perf_counter() - start, results, _worker_generator.instrumentation.export()
 
 
 def sanitize_filename(name: str) -> str:
@@ -1,25 +1,256 @@
 """
 Email Sender - Send certificates via email to participants
 """
+import base64
 import smtplib
 import os
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
+import queue
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from email.header import Header
+from email.utils import encode_rfc2231, formataddr
 from pathlib import Path
 from typing import Optional
+from instrumentation import NO_INSTRUMENTATION
+from outbox import Outbox, FAILED, PENDING, SENT
+from scheduler import DAY, Account, QuotaScheduler
+
+
+def new_run_id() -> str:
+    """Make an id for a new outbox run, e.g. '20240315-142501-a3f9c1'."""
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{secrets.token_hex(3)}"
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Decide whether a failed send is worth retrying later.
+    
+    4xx SMTP replies (greylisting, rate limits, "try again later") and dropped or
+    refused connections are transient; 5xx replies, bad credentials and missing
+    certificate files are not.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, FileNotFoundError):
+        return False
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+class MessageFactory:
+    """
+    Build certificate emails as raw bytes from a skeleton encoded once.
+    
+    The headers, MIME boundaries and part headers that are the same for every
+    recipient are encoded when the factory is created. Building a message then
+    only formats the body with the name, fills in the recipient address and
+    base64-encodes the PDF bytes it is given. The output is equivalent to the
+    multipart/mixed message (plain text body + PDF attachment) the email package
+    would produce, ready for smtplib's sendmail().
+    """
+    
+    def __init__(self, sender_name: str, sender_email: str, subject: str, template: str):
+        """
+        Encode the shared parts of every message.
+        
+        Args:
+            sender_name: Display name in the From header
+            sender_email: Sender's email address
+            subject: Subject line
+            template: Body template with a {name} placeholder
+        """
+        self.sender_email = sender_email
+        self.template = template
+        boundary = f"==============={secrets.token_hex(16)}=="
+        
+        if subject.isascii():
+            subject_header = subject
+        else:
+            # Fold long subjects with CRLF like the rest of the message, never a bare LF
+            subject_header = Header(subject, 'utf-8').encode(linesep='\r\n')
+        
+        self._head = (
+            f'Content-Type: multipart/mixed; boundary="{boundary}"\r\n'
+            f'MIME-Version: 1.0\r\n'
+            f'From: {formataddr((sender_name, sender_email), "utf-8")}\r\n'
+            f'To: '
+        ).encode('ascii')
+        self._after_to = (
+            f'\r\nSubject: {subject_header}\r\n'
+            f'\r\n'
+            f'--{boundary}\r\n'
+        ).encode('ascii')
+        self._ascii_text = (
+            b'Content-Type: text/plain; charset="us-ascii"\r\n'
+            b'MIME-Version: 1.0\r\n'
+            b'Content-Transfer-Encoding: 7bit\r\n'
+            b'\r\n'
+        )
+        self._utf8_text = (
+            b'Content-Type: text/plain; charset="utf-8"\r\n'
+            b'MIME-Version: 1.0\r\n'
+            b'Content-Transfer-Encoding: base64\r\n'
+            b'\r\n'
+        )
+        self._attachment = (
+            f'\r\n--{boundary}\r\n'
+            f'Content-Type: application/pdf\r\n'
+            f'MIME-Version: 1.0\r\n'
+            f'Content-Transfer-Encoding: base64\r\n'
+            f'Content-Disposition: attachment; '
+        ).encode('ascii')
+        self._tail = f'\r\n--{boundary}--\r\n'.encode('ascii')
+    
+    def build(self, recipient_email: str, recipient_name: str, attachment: bytes,
+              filename: str) -> bytes:
+        """
+        Build one message.
+        
+        Args:
+            recipient_email: Recipient's email address
+            recipient_name: Recipient's name (fills {name} in the body)
+            attachment: The certificate PDF
+            filename: Attachment file name
+        
+        Returns:
+            The encoded message
+        """
+        if '\r' in recipient_email or '\n' in recipient_email:
+            raise ValueError(f"Invalid recipient address: {recipient_email!r}")
+        
+        body = self.template.format(name=recipient_name)
+        if body.isascii():
+            text = self._ascii_text + body.replace('\r\n', '\n').replace('\n', '\r\n').encode('ascii')
+        else:
+            text = self._utf8_text + base64.encodebytes(body.encode('utf-8')).replace(b'\n', b'\r\n')
+        
+        if filename.isascii():
+            disposition = f'filename="{filename}"\r\n\r\n'.encode('ascii')
+        else:
+            disposition = f"filename*={encode_rfc2231(filename, 'utf-8')}\r\n\r\n".encode('ascii')
+        
+        return b''.join((
+            self._head, recipient_email.encode('utf-8'), self._after_to,
+            text,
+            self._attachment, disposition,
+            base64.encodebytes(attachment).replace(b'\n', b'\r\n'),
+            self._tail,
+        ))
+
+
+class RateLimiter:
+    """Thread-safe token bucket limiting messages per second and per minute."""
+    
+    def __init__(self, per_second: Optional[float] = None, per_minute: Optional[float] = None):
+        """
+        Set up the buckets; a limit of None (or 0) means unlimited.
+        
+        Args:
+            per_second: Maximum messages per second (also the burst size)
+            per_minute: Maximum messages per minute
+        """
+        # Each bucket is [capacity, refill per second, tokens]
+        self._buckets = []
+        if per_second:
+            self._buckets.append([float(per_second), float(per_second), float(per_second)])
+        if per_minute:
+            self._buckets.append([float(per_minute), per_minute / 60.0, float(per_minute)])
+        self._lock = threading.Lock()
+        self._last = time.monotonic()
+    
+    @property
+    def rate(self) -> Optional[float]:
+        """Sustained messages per second allowed, or None if unlimited."""
+        return min((bucket[1] for bucket in self._buckets), default=None)
+    
+    def acquire(self):
+        """Block until every bucket has a token, then take one from each."""
+        if not self._buckets:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._last
+                self._last = now
+                wait = 0.0
+                for bucket in self._buckets:
+                    capacity, rate, tokens = bucket
+                    bucket[2] = tokens = min(capacity, tokens + elapsed * rate)
+                    if tokens < 1:
+                        wait = max(wait, (1 - tokens) / rate)
+                if wait == 0.0:
+                    for bucket in self._buckets:
+                        bucket[2] -= 1
+                    return
+            time.sleep(wait)
+
+
+class SMTPConnection:
+    """One persistent, authenticated SMTP connection that reconnects when dropped."""
+    
+    def __init__(self, sender: 'EmailSender', account: Account):
+        """
+        Args:
+            sender: The EmailSender whose settings are used to connect
+            account: The sender account to log in as
+        """
+        self.sender = sender
+        self.account = account
+        self.server = None
+        self.sent = 0
+    
+    def send(self, recipient_email: str, msg: bytes):
+        """Send an encoded message, reconnecting once if the server dropped the connection."""
+        sender = self.sender
+        for attempt in range(2):
+            if self.server is None or self.sent >= sender.max_messages_per_connection:
+                self.close()
+                self.server = sender._connect(self.account)
+            try:
+                with sender.instrumentation.stage('smtp_send'):
+                    self.server.sendmail(self.account.sender_email, [recipient_email], msg)
+                self.sent += 1
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                error = e
+            except smtplib.SMTPResponseException as e:
+                # 421: service closing the channel (e.g. too many messages on this connection)
+                if e.smtp_code != 421:
+                    raise
+                error = e
+            sender.instrumentation.count('smtp_reconnects')
+            # Close the dead connection's socket rather than just dropping it
+            self.close()
+        raise error
+    
+    def close(self):
+        """Log out and close the connection, if open."""
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                self.server.close()
+            self.server = None
+            self.sent = 0
 
 
 class EmailSender:
     """Send certificates via email with custom templates."""
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, instrumentation=None):
         """
         Initialize email sender with SMTP configuration.
         
         Args:
             config: Email configuration dictionary
+            instrumentation: Optional Instrumentation to record per-stage timings in
         """
+        self.instrumentation = instrumentation or NO_INSTRUMENTATION
         self.smtp_server = config.get('smtp_server', 'smtp.gmail.com')
         self.smtp_port = config.get('smtp_port', 587)
         self.sender_email = config.get('sender_email', '')
@@ -27,7 +258,51 @@ class EmailSender:
         self.sender_name = config.get('sender_name', 'IEEE Student Branch')
         self.email_subject = config.get('email_subject', 'Your Participation Certificate')
         self.email_template = config.get('email_template', self._default_template())
+        self.use_tls = config.get('smtp_use_tls', True)
+        
+        # Sender accounts: either a list under 'accounts' (each with its own login and
+        # optional daily/hourly quota) or the single account configured above
+        self.accounts = [
+            Account(
+                sender_email=account.get('sender_email', ''),
+                sender_password=account.get('sender_password', ''),
+                sender_name=account.get('sender_name', self.sender_name),
+                smtp_server=account.get('smtp_server', self.smtp_server),
+                smtp_port=account.get('smtp_port', self.smtp_port),
+                daily_quota=account.get('daily_quota'),
+                hourly_quota=account.get('hourly_quota'),
+            )
+            for account in (config.get('accounts') or [config])
+        ]
+        self.scheduler = QuotaScheduler(self.accounts)
+        self.message_factories = {
+            account.sender_email: MessageFactory(account.sender_name, account.sender_email,
+                                                 self.email_subject, self.email_template)
+            for account in self.accounts
+        }
+        self.message_factory = self.message_factories[self.accounts[0].sender_email]
         
+        # Persistent session state used by send_batch (see session())
+        self.max_messages_per_connection = config.get('max_messages_per_connection', 100)
+        self._in_session = False
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        
+        # Concurrency and rate limits for send_batch
+        self.connections = max(1, int(config.get('connections', 1)))
+        self.rate_limiter = RateLimiter(config.get('max_per_second'), config.get('max_per_minute'))
+        
+        # Durable outbox and retry policy for send_batch / resume
+        self.outbox_path = config.get('outbox_path', 'email_outbox.db')
+        self.run = None  # Outbox run of the current batch (see send_batch())
+        self.max_attempts = max(1, int(config.get('max_attempts', 5)))
+        self.retry_backoff = config.get('retry_backoff', 2.0)
+        self.retry_backoff_max = config.get('retry_backoff_max', 300.0)
+        
+        # Certificates buffered between generation and sending in pipeline()
+        self.pipeline_queue_size = config.get('pipeline_queue_size')
+    
     def _default_template(self) -> str:
         """Get default email template."""
         return """Dear {name},
@@ -40,9 +315,109 @@ Please find attached your Participation Certificate for the event.
 
 Best regards,
 IEEE Student Branch"""
+
+    def _connect(self, account: Optional[Account] = None) -> smtplib.SMTP:
+        """Open an SMTP connection for an account (default: the first), upgrade it to TLS and log in."""
+        account = account or self.accounts[0]
+        instrumentation = self.instrumentation
+        with instrumentation.stage('smtp_connect'):
+            server = smtplib.SMTP(account.smtp_server, account.smtp_port)
+        instrumentation.count('smtp_connections')
+        try:
+            if self.use_tls:
+                with instrumentation.stage('smtp_starttls'):
+                    server.starttls()
+            if account.sender_password:
+                with instrumentation.stage('smtp_login'):
+                    server.login(account.sender_email, account.sender_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+    
+    def _disconnect(self):
+        """Close every persistent connection opened during the session."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+    
+    def _connection(self, account: Account) -> SMTPConnection:
+        """Get this thread's persistent connection for an account, creating it on first use."""
+        connections = self._local.__dict__.setdefault('connections', {})
+        connection = connections.get(account.sender_email)
+        if connection is None:
+            connection = connections[account.sender_email] = SMTPConnection(self, account)
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+    
+    @contextmanager
+    def session(self):
+        """
+        Keep authenticated SMTP connections open for every send inside the block.
+        
+        Each sending thread gets its own connection, opened lazily, recycled after
+        max_messages_per_connection messages and re-established if the server drops it.
+        """
+        self._in_session = True
+        try:
+            yield self
+        finally:
+            self._in_session = False
+            self._disconnect()
+    
+    def __enter__(self):
+        self._in_session = True
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._in_session = False
+        self._disconnect()
+    
+    def deliver(self, recipient_email: str, recipient_name: str, certificate_path: str,
+                attachment: Optional[bytes] = None, account: Optional[Account] = None):
+        """
+        Build and send one certificate email, raising on any failure.
+        
+        Inside session() (as send_batch does) the message goes over the sending
+        thread's persistent connection; otherwise a connection is opened just for
+        this message.
+        
+        Args:
+            recipient_email: Recipient's email address
+            recipient_name: Recipient's name
+            certificate_path: Path to the certificate PDF (its file name is used for
+                the attachment)
+            attachment: The PDF bytes, if already in memory; otherwise the file is read
+            account: Sender account to send from (default: the first)
+        
+        Raises:
+            FileNotFoundError: If the certificate isn't given and the file doesn't exist
+            smtplib.SMTPException / OSError: If sending fails
+        """
+        instrumentation = self.instrumentation
+        account = account or self.accounts[0]
+        if attachment is None:
+            with instrumentation.stage('read_attachment'):
+                attachment = Path(certificate_path).read_bytes()
+        with instrumentation.stage('build_message'):
+            msg = self.message_factories[account.sender_email].build(recipient_email, recipient_name, attachment,
+                                             os.path.basename(certificate_path))
+        
+        # Send email
+        if self._in_session:
+            self._connection(account).send(recipient_email, msg)
+        else:
+            with self._connect(account) as server:
+                with instrumentation.stage('smtp_send'):
+                    server.sendmail(account.sender_email, [recipient_email], msg)
+        
+        instrumentation.count('emails_sent')
     
     def send_certificate(self, recipient_email: str, recipient_name: str, 
-                        certificate_path: str) -> bool:
+                        certificate_path: str, attachment: Optional[bytes] = None) -> bool:
         """
         Send certificate via email to a participant.
         
@@ -50,87 +425,413 @@ IEEE Student Branch"""
             recipient_email: Recipient's email address
             recipient_name: Recipient's name
             certificate_path: Path to the certificate PDF
-            
+            attachment: The PDF bytes, if already in memory
+        
         Returns:
             True if sent successfully, False otherwise
         """
         try:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = f"{self.sender_name} <{self.sender_email}>"
-            msg['To'] = recipient_email
-            msg['Subject'] = self.email_subject
-            
-            # Format email body with recipient name
-            body = self.email_template.format(name=recipient_name)
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # Attach certificate PDF
-            if os.path.exists(certificate_path):
-                with open(certificate_path, 'rb') as f:
-                    pdf_attachment = MIMEApplication(f.read(), _subtype='pdf')
-                    pdf_attachment.add_header(
-                        'Content-Disposition', 
-                        'attachment', 
-                        filename=os.path.basename(certificate_path)
-                    )
-                    msg.attach(pdf_attachment)
-            else:
-                print(f"  Warning: Certificate file not found: {certificate_path}")
-                return False
-            
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(msg)
-            
+            self.deliver(recipient_email, recipient_name, certificate_path, attachment)
             return True
-            
+        
         except Exception as e:
+            self.instrumentation.count('emails_failed')
             print(f"  Error sending email to {recipient_email}: {e}")
             return False
     
     def send_batch(self, participants: list, certificate_dir: str, 
-                   filename_template: str = "{name}_certificate.pdf") -> tuple:
+                   filename_template: str = "{name}_certificate.pdf", run: Optional[str] = None) -> tuple:
         """
-        Send certificates to multiple participants.
+        Send certificates to multiple participants through the durable outbox.
+        
+        Every (run, recipient, certificate) job is recorded in the outbox first, so
+        an interrupted batch can be finished later with resume(), and sending
+        again with the same run id skips the recipients that run already reached.
+        Without a run id every call is a new run and mails everyone. Transient
+        failures are retried with exponential backoff (see _drain()).
         
         Args:
             participants: List of dicts with 'name' and 'email' keys
             certificate_dir: Directory containing certificates
             filename_template: Template for certificate filenames
-            
+            run: Outbox run to send as (default: a new run, see new_run_id())
+        
+        Returns:
+            Tuple of (successful_count, failed_count, failed_list); recipients
+            skipped as already sent are only counted in batch_summary
+        """
+        self.run = run or new_run_id()
+        with Outbox(self.outbox_path) as outbox:
+            batch = outbox.start_batch()
+            _, already_sent = self._enqueue(outbox, batch, participants, certificate_dir, filename_template)
+            return self._drain(outbox, batch, already_sent)
+    
+    def pipeline(self, participants: list, certificate_dir: str,
+                 filename_template: str = "{name}_certificate.pdf",
+                 run: Optional[str] = None, keep_files: bool = False) -> 'SendPipeline':
+        """
+        Start sending certificates while they are still being generated.
+        
+        Use as a context manager and submit() each certificate as soon as it is
+        rendered; see SendPipeline.
+        
+        Args:
+            participants: List of dicts with 'name' and 'email' keys
+            certificate_dir: Directory the certificates are (or would be) saved in
+            filename_template: Template for certificate filenames
+            run: Outbox run to send as (default: a new run, see send_batch())
+            keep_files: Write certificates submitted as bytes to certificate_dir
+                before queueing them, so resume() can send them after a crash
+        """
+        return SendPipeline(self, participants, certificate_dir, filename_template, run, keep_files)
+    
+    def resume(self) -> tuple:
+        """
+        Send every job still pending in the outbox, e.g. after a crash or restart.
+        
+        Each job stays in the run it was queued in. Jobs whose certificate was
+        never written (generation stopped before reaching them) stay pending:
+        sending their run again generates and sends them. Their number is in
+        batch_summary['missing'].
+        
         Returns:
             Tuple of (successful_count, failed_count, failed_list)
         """
-        successful = 0
-        failed = 0
-        failed_list = []
+        self.run = None
+        with Outbox(self.outbox_path) as outbox:
+            batch = outbox.start_batch()
+            print(f"Resuming {outbox.adopt_pending(batch)} pending emails from {self.outbox_path}")
+            missing = [job['id'] for job in outbox.due(batch) if not os.path.exists(job['certificate_path'])]
+            if missing:
+                outbox.detach(missing)
+                print(f"  {len(missing)} of them have no certificate file yet; send their run again "
+                      f"to generate and send them")
+            result = self._drain(outbox, batch)
+            self.batch_summary['missing'] = len(missing)
+            return result
+    
+    def _enqueue(self, outbox: Outbox, batch: int, participants: list, certificate_dir: str,
+                 filename_template: str) -> tuple:
+        """
+        Record a job in the outbox batch for every participant, in run self.run.
         
+        Returns:
+            Tuple of ({index: job row} for jobs still to send, number already sent)
+        """
+        pending = {}
+        already_sent = 0
         for i, participant in enumerate(participants, 1):
             name = participant.get('name', '')
             email = participant.get('email', '')
             
-            if not email or not name:
-                print(f"  ✗ Skipping participant {i}: Missing name or email")
-                failed += 1
-                failed_list.append({'name': name, 'email': email, 'reason': 'Missing name or email'})
-                continue
-            
             # Clean name for filename
             clean_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in name)
             filename = filename_template.format(name=clean_name, index=i)
-            certificate_path = os.path.join(certificate_dir, filename)
             
-            print(f"Sending email {i}/{len(participants)}: {name} ({email})")
+            if not email or not name:
+                print(f"  ✗ Skipping participant {i}: Missing name or email")
+                outbox.add_failed(batch, self.run, email, name, filename, 'Missing name or email')
+                continue
+            if participant.get('email_error'):
+                # Flagged by email_validation.check_emails; not worth an SMTP attempt
+                print(f"  ✗ Skipping {name} <{email}>: {participant['email_error']}")
+                outbox.add_failed(batch, self.run, email, name, filename, participant['email_error'])
+                continue
             
-            if self.send_certificate(email, name, certificate_path):
-                successful += 1
-                print(f"  ✓ Email sent successfully")
+            certificate_path = os.path.join(certificate_dir, filename)
+            job = outbox.enqueue(batch, self.run, email, name, filename, certificate_path)
+            if job['state'] == SENT:
+                already_sent += 1
             else:
-                failed += 1
-                failed_list.append({'name': name, 'email': email, 'reason': 'Sending failed'})
-                print(f"  ✗ Failed to send email")
+                pending[i] = job
         
-        return successful, failed, failed_list
+        if already_sent:
+            print(f"  ↻ {already_sent} recipients already received their certificate in run {self.run}; skipping them")
+        return pending, already_sent
+    
+    def _attempt(self, job, attachment: Optional[bytes] = None) -> tuple:
+        """
+        Send one outbox job from the account the quota scheduler picks, under the rate limit.
+        
+        Returns:
+            Tuple of (error or None, account used)
+        """
+        account = self.scheduler.acquire()
+        self.rate_limiter.acquire()
+        try:
+            self.deliver(job['email'], job['name'], job['certificate_path'], attachment, account)
+            return None, account
+        except Exception as e:
+            self.scheduler.release(account)
+            return e, account
+    
+    def _record(self, outbox: Outbox, job, error: Optional[Exception], progress: dict,
+                attachment: Optional[bytes] = None, account: Optional[Account] = None):
+        """
+        Record the outcome of one attempt in the outbox.
+        
+        A transient failure is retried after retry_backoff * 2^(attempt - 1) seconds
+        (capped at retry_backoff_max), up to max_attempts attempts. If the attempt
+        was made from in-memory bytes, they are saved to the job's certificate path
+        first so the retry (or a later resume()) can read them back.
+        
+        Args:
+            outbox: Open outbox
+            job: The job's outbox row
+            error: The attempt's exception, or None if it was sent
+            progress: Dict with 'done' and 'total' counts, updated for the output
+            attachment: The PDF bytes used for the attempt, if they came from memory
+            account: The sender account used, whose quota the send counts against
+        """
+        if error is None:
+            outbox.mark_sent(job['id'], account.sender_email if account else None)
+            progress['done'] += 1
+            print(f"  ✓ [{progress['done']}/{progress['total']}] {job['name']} ({job['email']})")
+        elif is_transient(error) and job['attempts'] + 1 < self.max_attempts:
+            if attachment is not None and not os.path.exists(job['certificate_path']):
+                Path(job['certificate_path']).parent.mkdir(parents=True, exist_ok=True)
+                Path(job['certificate_path']).write_bytes(attachment)
+            delay = min(self.retry_backoff * 2 ** job['attempts'], self.retry_backoff_max)
+            outbox.mark_retry(job['id'], str(error), delay)
+            self.instrumentation.count('email_retries')
+            print(f"  ↻ {job['name']} ({job['email']}): {error}; retrying in {delay:.1f}s")
+        else:
+            outbox.mark_failed(job['id'], str(error))
+            self.instrumentation.count('emails_failed')
+            print(f"  ✗ {job['name']} ({job['email']}): {error}")
+    
+    def _drain(self, outbox: Outbox, batch: int, already_sent: int = 0) -> tuple:
+        """
+        Send the batch's pending jobs until each one is sent or has failed for good.
+        
+        Messages go over persistent authenticated connections (see session()). With
+        'connections' > 1 in the config, that many worker threads send in parallel,
+        each on its own connection; 'max_per_second' / 'max_per_minute' cap the
+        overall sending rate either way. Failures are handled by _record(), which
+        always runs on the calling thread.
+        
+        Args:
+            outbox: Open outbox
+            batch: Batch id to drain
+            already_sent: Jobs in the batch that were sent in an earlier run
+        
+        Returns:
+            Tuple of (successful_count, failed_count, failed_list)
+        """
+        counts = outbox.counts(batch)
+        progress = {'done': counts[SENT], 'total': sum(counts.values())}
+        self._schedule(outbox, counts[PENDING])
+        
+        with self.session():
+            pool = ThreadPoolExecutor(max_workers=self.connections) if self.connections > 1 else None
+            try:
+                while True:
+                    jobs = outbox.due(batch)
+                    if not jobs:
+                        wake = outbox.next_attempt_at(batch)
+                        if wake is None:
+                            break
+                        time.sleep(max(0.0, wake - time.time()))
+                        continue
+                    
+                    outcomes = pool.map(self._attempt, jobs) if pool else map(self._attempt, jobs)
+                    for job, (error, account) in zip(jobs, outcomes):
+                        self._record(outbox, job, error, progress, account=account)
+            finally:
+                if pool:
+                    pool.shutdown()
+        
+        return self._result(outbox, batch, already_sent)
+    
+    def estimate_completion(self, remaining: int) -> float:
+        """
+        Estimate when the remaining emails will all have been sent.
+        
+        Combines the accounts' remaining daily/hourly quotas (see QuotaScheduler) with
+        the configured rate limit; time spent talking to the server isn't included.
+        
+        Args:
+            remaining: Number of emails still to send
+        
+        Returns:
+            Unix time of the estimated completion
+        """
+        now = time.time()
+        eta = self.scheduler.estimate(remaining, now)
+        if self.rate_limiter.rate:
+            eta = max(eta, now + remaining / self.rate_limiter.rate)
+        return eta
+    
+    def _schedule(self, outbox: Outbox, remaining: int):
+        """Load the accounts' recent sends from the outbox and print the ETA if quotas apply."""
+        self.scheduler.load(outbox.recent_sends(time.time() - DAY))
+        if self.scheduler.limited and remaining:
+            eta = self.estimate_completion(remaining)
+            print(f"  ⏱ {remaining} emails over {len(self.accounts)} sender account(s); "
+                  f"estimated completion {datetime.fromtimestamp(eta):%Y-%m-%d %H:%M}")
+    
+    def _result(self, outbox: Outbox, batch: int, already_sent: int) -> tuple:
+        """
+        Summarize a finished batch in self.batch_summary and as (successful, failed, failed_list).
+        
+        successful only counts emails sent by this batch, not the already_sent ones.
+        """
+        counts = outbox.counts(batch)
+        sent = counts[SENT] - already_sent
+        self.batch_summary = {'run': self.run, 'sent': sent, 'already_sent': already_sent,
+                              'failed': counts[FAILED], 'pending': counts[PENDING]}
+        return sent, counts[FAILED], outbox.failed(batch)
+
+
+class SendPipeline:
+    """
+    Mail certificates as soon as they are rendered instead of after the whole batch.
+    
+    The generating code submit()s each certificate (by its 1-based position in the
+    participant list, optionally with the PDF bytes) into a bounded queue, and
+    'connections' sender threads take them from there. submit() blocks while the
+    queue is full, so at most pipeline_queue_size certificates plus one per sender
+    are held in memory however large the batch is. Jobs go through the same outbox
+    as send_batch(): recipients the run already reached are skipped, and
+    on leaving the with block anything waiting for a retry (or never submitted) is
+    sent from disk before the result is available in self.result. If a send or
+    its bookkeeping raises in a sender thread, that job is failed, the thread
+    keeps going, and the error is re-raised on leaving the with block (jobs
+    still pending are then left for resume()).
+    
+    Example:
+        with email_sender.pipeline(participants, output_dir) as pipeline:
+            for i, participant in enumerate(participants, 1):
+                pipeline.submit(i, attachment=render(participant))
+        successful, failed, failed_list = pipeline.result
+    """
+    
+    def __init__(self, sender: EmailSender, participants: list, certificate_dir: str,
+                 filename_template: str, run: Optional[str] = None, keep_files: bool = False):
+        """
+        Args:
+            sender: EmailSender to send with
+            participants: List of dicts with 'name' and 'email' keys
+            certificate_dir: Directory the certificates are (or would be) saved in
+            filename_template: Template for certificate filenames
+            run: Outbox run to send as (default: a new run)
+            keep_files: Write certificates submitted as bytes to certificate_dir
+                before queueing them (otherwise only those waiting for a retry are)
+        """
+        self.sender = sender
+        self.participants = participants
+        self.certificate_dir = certificate_dir
+        self.filename_template = filename_template
+        self.run = run or new_run_id()
+        self.keep_files = keep_files
+        self.queue_size = sender.pipeline_queue_size or 2 * sender.connections
+        self.result = None
+    
+    def __enter__(self):
+        sender = self.sender
+        sender.run = self.run
+        self._outbox = Outbox(sender.outbox_path)
+        self._batch = self._outbox.start_batch()
+        self._pending, self._already_sent = sender._enqueue(
+            self._outbox, self._batch, self.participants, self.certificate_dir, self.filename_template
+        )
+        counts = self._outbox.counts(self._batch)
+        self._progress = {'done': counts[SENT], 'total': sum(counts.values())}
+        sender._schedule(self._outbox, counts[PENDING])
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._errors = []
+        
+        sender.__enter__()
+        self._senders = [threading.Thread(target=self._send_loop, daemon=True)
+                         for _ in range(sender.connections)]
+        for thread in self._senders:
+            thread.start()
+        return self
+    
+    def needs(self, index: int) -> bool:
+        """Check whether the participant at a 1-based index still has to be sent (so rendering can be skipped)."""
+        return index in self._pending
+    
+    def submit(self, index: int, ok: bool = True, attachment: Optional[bytes] = None):
+        """
+        Hand over one rendered certificate for sending.
+        
+        Args:
+            index: 1-based position of the participant in the participant list
+            ok: False if the certificate couldn't be generated (the job is failed)
+            attachment: The PDF bytes; if None the file is read from certificate_dir
+        
+        Raises:
+            RuntimeError: Every sender thread has stopped, so nothing would take the certificate
+        """
+        job = self._pending.pop(index, None)
+        if job is None:
+            return
+        if not ok:
+            with self._lock:
+                self.sender._record(self._outbox, job, RuntimeError('Certificate generation failed'),
+                                    self._progress)
+            return
+        if self.keep_files and attachment is not None:
+            Path(job['certificate_path']).parent.mkdir(parents=True, exist_ok=True)
+            Path(job['certificate_path']).write_bytes(attachment)
+        if not self._put((job, attachment)):
+            raise RuntimeError('Email sender threads have stopped') from (self._errors or [None])[0]
+    
+    def _put(self, item) -> bool:
+        """
+        Queue an item for the sender threads, waiting while the queue is full.
+        
+        Returns:
+            False (without queueing it) if every sender thread has stopped
+        """
+        while True:
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                if not any(thread.is_alive() for thread in self._senders):
+                    return False
+    
+    def _send_loop(self):
+        """Sender thread: send queued certificates until the end-of-batch marker."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            job, attachment = item
+            try:
+                error, account = self.sender._attempt(job, attachment)
+                with self._lock:
+                    self.sender._record(self._outbox, job, error, self._progress, attachment, account)
+            except Exception as e:
+                self._crashed(job, e)
+    
+    def _crashed(self, job, error: Exception):
+        """Fail a job whose send or bookkeeping raised, and keep the error for __exit__."""
+        with self._lock:
+            self._errors.append(error)
+            try:
+                self._outbox.mark_failed(job['id'], f"{type(error).__name__}: {error}")
+            except Exception:
+                # The outbox itself is failing; the job stays pending for resume()
+                pass
+        print(f"  ✗ {job['name']} ({job['email']}): {type(error).__name__}: {error}")
+    
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            for _ in self._senders:
+                if not self._put(None):
+                    break
+            for thread in self._senders:
+                thread.join()
+            if self._errors and exc_type is None:
+                raise self._errors[0]
+            # Retries and anything never submitted are sent from disk; if generation
+            # crashed, leave them pending for resume() instead
+            if exc_type is None:
+                self.result = self.sender._drain(self._outbox, self._batch, self._already_sent)
+        finally:
+            self.sender.__exit__(None, None, None)
+            self._outbox.close()
@@ -0,0 +1,179 @@
+"""
+Email Validation - Check participant email addresses in bulk before anything is generated or sent
+"""
+import difflib
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from participant_loader import ParticipantTable
+
+
+# Deliberately plain: one @, a dot-atom local part and a domain ending in a 2+ letter TLD
+EMAIL_PATTERN = (r"^[A-Za-z0-9.!#$%&'*+/=?^_`{|}~-]+@"
+                 r"(?:[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?\.)+[A-Za-z]{2,}$")
+
+# Domains most participants use; addresses whose domain is a truncation or a
+# near miss of one of these are flagged as likely typos (first match wins)
+KNOWN_DOMAINS = (
+    'gmail.com', 'googlemail.com',
+    'yahoo.com', 'yahoo.co.in', 'yahoo.in', 'yahoo.co.uk', 'ymail.com',
+    'outlook.com', 'outlook.in', 'hotmail.com', 'hotmail.co.uk', 'live.com', 'msn.com',
+    'icloud.com', 'me.com', 'rediffmail.com', 'protonmail.com', 'proton.me', 'aol.com',
+    'ieee.org',
+)
+
+# Real mail domains close enough to a known one to look like a typo of it; never flagged
+REAL_DOMAINS = frozenset((
+    'mail.com', 'email.com', 'gmx.com', 'gmx.net', 'mac.com', 'aim.com', 'zoho.com',
+    'rocketmail.com', 'fastmail.com', 'hushmail.com', 'yandex.com', 'pm.me',
+))
+
+# How close (difflib ratio) a domain must be to a known one to count as a typo
+TYPO_SIMILARITY = 0.85
+
+
+def suggest_domain(domain: str) -> Optional[str]:
+    """
+    Guess the intended domain for a likely typo, e.g. 'gmail.c' or 'gmial.com' -> 'gmail.com'.
+    
+    Only domains with the same number of labels as a known one are compared, so
+    a longer real domain ('yahoo.com.sg') is never taken for a typo, and a
+    domain that only differs from a known one in a two-letter country code
+    ('yahoo.co.nz' vs 'yahoo.co.in') is left alone.
+    
+    Args:
+        domain: Lower-case domain part of an address
+    
+    Returns:
+        The known domain it probably should be, or None if it looks intentional
+    """
+    if not domain or domain in KNOWN_DOMAINS or domain in REAL_DOMAINS:
+        return None
+    labels = domain.rstrip('.').split('.')
+    
+    # Truncated addresses: 'gm', 'gmai', 'gmail.' (no TLD yet), or 'gmail.co' where
+    # only the last label was cut short
+    if len(labels) == 1 and len(labels[0]) >= 2:
+        for known in KNOWN_DOMAINS:
+            if known.startswith(labels[0]):
+                return known
+    for known in KNOWN_DOMAINS:
+        known_labels = known.split('.')
+        if (len(known_labels) == len(labels) > 1 and known_labels[:-1] == labels[:-1]
+                and known_labels[-1].startswith(labels[-1])):
+            return known
+    
+    candidates = [known for known in KNOWN_DOMAINS if known.count('.') == len(labels) - 1]
+    for known in difflib.get_close_matches(domain, candidates, n=3, cutoff=TYPO_SIMILARITY):
+        if known.split('.')[0] == labels[0] and len(labels[-1]) == 2:
+            # Same provider under another country code, not a typo
+            continue
+        return known
+    return None
+
+
+def normalize_emails(emails: pd.Series) -> pd.Series:
+    """
+    Normalize addresses: trim, drop a 'mailto:' prefix and inner spaces, lower-case the domain.
+    
+    The local part keeps its case; mail providers treat it case-insensitively anyway.
+    """
+    emails = emails.fillna('').str.strip()
+    emails = emails.str.replace(r'^mailto:', '', case=False, regex=True).str.replace(r'\s+', '', regex=True)
+    parts = emails.str.rpartition('@')
+    return emails.where(parts[1] == '', parts[0] + '@' + parts[2].str.lower())
+
+
+class EmailReport:
+    """
+    What the pre-flight check found: one row per flagged participant.
+    
+    issues has columns row (1-based position among the loaded participants),
+    name, email, issue ('invalid', 'typo' or 'duplicate') and suggestion (the
+    probable intended address, if there is one).
+    """
+    
+    def __init__(self, total: int, issues: pd.DataFrame):
+        self.total = total
+        self.issues = issues
+    
+    def count(self, issue: str) -> int:
+        """Number of participants flagged with the given issue."""
+        return int((self.issues['issue'] == issue).sum())
+    
+    @property
+    def ok(self) -> bool:
+        """Whether every address passed."""
+        return self.issues.empty
+    
+    def format(self, limit: int = 20) -> str:
+        """
+        Render the report as text for the console.
+        
+        Args:
+            limit: Show at most this many flagged rows
+        """
+        lines = [f"Email check: {self.total} participants, {self.count('invalid')} invalid, "
+                 f"{self.count('typo')} likely typos, {self.count('duplicate')} duplicates removed"]
+        labels = {'invalid': 'invalid address (not emailed)', 'typo': 'likely typo (still emailed)', 'duplicate': 'duplicate (removed)'}
+        for row in self.issues.head(limit).itertuples():
+            hint = f" -> did you mean {row.suggestion}?" if row.suggestion else ''
+            lines.append(f"  row {row.row}: {row.name} <{row.email}>: {labels[row.issue]}{hint}")
+        if len(self.issues) > limit:
+            lines.append(f"  ... and {len(self.issues) - limit} more")
+        return '\n'.join(lines)
+
+
+def check_emails(table: ParticipantTable) -> Tuple[ParticipantTable, EmailReport]:
+    """
+    Pre-flight check of every participant's email address, as whole-column operations.
+    
+    Addresses are normalized, then checked against EMAIL_PATTERN and the
+    KNOWN_DOMAINS typo table (once per distinct domain). Case-insensitive
+    duplicates are dropped, keeping the first row. Invalid addresses stay in
+    the table, so their certificates are still generated, but get an
+    'email_error' field; the sender records those as failed without contacting
+    the server. Likely typos are only reported, with their suggestion: the
+    heuristic can be wrong, so they are still emailed.
+    
+    Args:
+        table: Participants loaded with include_emails
+    
+    Returns:
+        Tuple of (checked ParticipantTable, EmailReport)
+    """
+    df = pd.DataFrame(table.columns)
+    df['email'] = emails = normalize_emails(df['email'])
+    
+    valid = emails.str.match(EMAIL_PATTERN)
+    local, _, domain = (emails.str.rpartition('@')[i] for i in range(3))
+    suggestion = domain.map({d: suggest_domain(d) for d in domain.unique()})
+    suggested = (local + '@' + suggestion).where(suggestion.notna() & (local != ''))
+    typo = valid & suggested.notna()
+    duplicate = emails.str.lower().duplicated()
+    
+    issue = pd.Series(None, index=df.index, dtype=object)
+    issue[~valid] = 'invalid'
+    issue[typo] = 'typo'
+    issue[duplicate] = 'duplicate'
+    flagged = issue.notna()
+    issues = pd.DataFrame({
+        'row': df.index[flagged] + 1,
+        'name': df['name'][flagged],
+        'email': emails[flagged],
+        'issue': issue[flagged],
+        'suggestion': suggested[flagged].astype(object).where(suggested[flagged].notna(), None),
+    }).reset_index(drop=True)
+    
+    hint = (' (did you mean ' + suggested + '?)').fillna('')
+    error = pd.Series(None, index=df.index, dtype=object)
+    error[~valid] = 'Invalid email address' + hint[~valid]
+    if error.notna().any():
+        df['email_error'] = error
+    
+    df = df[~duplicate]
+    checked = ParticipantTable({
+        key: values.astype(object).where(values.notna(), None).tolist() for key, values in df.items()
+    })
+    return checked, EmailReport(len(table), issues)
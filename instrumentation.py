@@ -0,0 +1,128 @@
+"""
+Instrumentation - Optional per-stage timers and counters for the hot paths
+"""
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Instrumentation:
+    """Collect wall-clock timings per stage and simple event counters."""
+    
+    enabled = True
+    
+    def __init__(self):
+        """Start with no timings and no counters."""
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.counters: Counter = Counter()
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time a block of code as one occurrence of a stage.
+        
+        Args:
+            name: Stage name, e.g. 'overlay' or 'smtp_login'
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name].append(time.perf_counter() - start)
+    
+    def count(self, name: str, n: int = 1):
+        """Add n to a named counter (safe to call from several threads)."""
+        with self._lock:
+            self.counters[name] += n
+    
+    def merge(self, data: dict):
+        """
+        Fold in timings and counters exported by another Instrumentation.
+        
+        Args:
+            data: Output of export(), e.g. from a worker process
+        """
+        for name, values in data.get('timings', {}).items():
+            self.timings[name].extend(values)
+        self.counters.update(data.get('counters', {}))
+    
+    def export(self) -> dict:
+        """Return timings and counters as plain (picklable) data and reset them."""
+        data = {'timings': dict(self.timings), 'counters': dict(self.counters)}
+        self.timings = defaultdict(list)
+        self.counters = Counter()
+        return data
+    
+    def summary(self) -> List[dict]:
+        """
+        Summarize every stage.
+        
+        Returns:
+            One dict per stage with count, total, mean, p50, p90, p99 and max (seconds)
+        """
+        rows = []
+        for name, values in self.timings.items():
+            ordered = sorted(values)
+            total = sum(ordered)
+            rows.append({
+                'stage': name,
+                'count': len(ordered),
+                'total': total,
+                'mean': total / len(ordered),
+                'p50': percentile(ordered, 50),
+                'p90': percentile(ordered, 90),
+                'p99': percentile(ordered, 99),
+                'max': ordered[-1],
+            })
+        rows.sort(key=lambda row: row['total'], reverse=True)
+        return rows
+    
+    def report(self) -> str:
+        """Format the stage breakdown and counters as a text table."""
+        rows = self.summary()
+        grand_total = sum(row['total'] for row in rows) or 1.0
+        lines = [f"{'stage':<18}{'count':>8}{'total s':>10}{'share':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"]
+        for row in rows:
+            lines.append(
+                f"{row['stage']:<18}{row['count']:>8}{row['total']:>10.3f}{row['total'] / grand_total:>8.1%}"
+                f"{row['p50'] * 1000:>10.2f}{row['p90'] * 1000:>10.2f}{row['p99'] * 1000:>10.2f}"
+            )
+        if self.counters:
+            lines.append("")
+            lines.extend(f"{name:<26}{value:>10}" for name, value in sorted(self.counters.items()))
+        return "\n".join(lines)
+
+
+class NullInstrumentation:
+    """Drop-in stand-in used when instrumentation is off; every call is a no-op."""
+    
+    enabled = False
+    _context = nullcontext()
+    
+    def stage(self, name: str):
+        return self._context
+    
+    def count(self, name: str, n: int = 1):
+        pass
+    
+    def merge(self, data: dict):
+        pass
+    
+    def export(self) -> dict:
+        return {}
+
+
+# Shared default so code paths never have to check whether instrumentation is on
+NO_INSTRUMENTATION = NullInstrumentation()
@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
 """
 Main entry point for Certificate Generator
+
+Only the standard library and light local modules are imported up front; pypdf and
+reportlab (certificate_generator), the SMTP stack (email_sender) and pandas
+(email_validation) are imported when a run actually needs them, so --help, argument
+errors and config errors return at once.
+Check startup time with benchmarks/bench_import.py.
 """
 import argparse
 import json
 import sys
 import os
+from contextlib import nullcontext
 from pathlib import Path
-import pandas as pd
-from certificate_generator import CertificateGenerator
-from email_sender import EmailSender
+from typing import TYPE_CHECKING
+from instrumentation import Instrumentation
+from participant_loader import ParticipantLoadError, load_participants as load_participant_table
+
+if TYPE_CHECKING:
+    from email_sender import EmailSender
 
 
 def load_config(config_path: str) -> dict:
@@ -25,75 +35,93 @@ def load_config(config_path: str) -> dict:
         sys.exit(1)
 
 
-def load_participants(file_path: str, include_emails: bool = False) -> list:
+def load_participants(file_path: str, include_emails: bool = False,
+                      include_fields: bool = False) -> list:
     """
     Load participant data from CSV or Excel file.
     
     Args:
         file_path: Path to participants file
-        include_emails: If True, return list of dicts with name and email
+        include_emails: If True, return list of dicts with name and email, after
+            checking the addresses (see email_validation.check_emails)
+        include_fields: If True, return list of row dicts that also hold every other
+            column, keyed by lower_snake_case column name (for multi-field layouts)
     
     Expected format: Columns named 'Name' and 'Email' (case-insensitive).
     """
-    file_ext = Path(file_path).suffix.lower()
-    
     try:
-        if file_ext == '.csv':
-            df = pd.read_csv(file_path)
-        elif file_ext in ['.xlsx', '.xls']:
-            df = pd.read_excel(file_path)
-        else:
-            print(f"Error: Unsupported file format '{file_ext}'. Use CSV or Excel.")
-            sys.exit(1)
-        
-        # Find the name column (case-insensitive search)
-        name_column = None
-        email_column = None
-        
-        for col in df.columns:
-            if 'name' in col.lower():
-                name_column = col
-            if 'email' in col.lower() or 'mail' in col.lower():
-                email_column = col
-        
-        if name_column is None:
-            print(f"Error: No 'Name' column found in {file_path}")
-            print(f"Available columns: {', '.join(df.columns)}")
-            sys.exit(1)
-        
-        if include_emails:
-            if email_column is None:
-                print(f"Error: No 'Email' column found in {file_path}")
-                print(f"Available columns: {', '.join(df.columns)}")
-                print("Hint: For email sending, your CSV must have both 'Name' and 'Email' columns.")
-                sys.exit(1)
-            
-            # Return list of dicts with name and email
-            participants = []
-            for _, row in df.iterrows():
-                name = str(row[name_column]) if pd.notna(row[name_column]) else None
-                email = str(row[email_column]) if pd.notna(row[email_column]) else None
-                if name and email:
-                    participants.append({'name': name, 'email': email})
-            
-            if not participants:
-                print("Error: No valid participant data found in the file.")
-                sys.exit(1)
-            
-            return participants
-        else:
-            # Return list of names only
-            names = df[name_column].dropna().astype(str).tolist()
-            
-            if not names:
-                print("Error: No participant names found in the file.")
-                sys.exit(1)
-            
-            return names
-        
+        table = load_participant_table(file_path, include_emails, include_fields)
+    except ParticipantLoadError as e:
+        print(f"Error: {e} in {file_path}")
+        if e.hint:
+            print(e.hint)
+        sys.exit(1)
     except Exception as e:
         print(f"Error loading participants from {file_path}: {e}")
         sys.exit(1)
+    
+    if include_emails:
+        # Report bad and duplicate addresses before anything is generated or sent
+        from email_validation import check_emails
+        table, report = check_emails(table)
+        print(report.format())
+    
+    return table.records() if include_emails or include_fields else table.names
+
+
+def load_email_config(config: dict) -> dict:
+    """Get the email config, with the body template loaded, or exit if credentials are missing."""
+    email_config = config.get('email', {})
+    
+    # Load email template if specified
+    template_file = email_config.get('email_template_file')
+    if template_file and os.path.exists(template_file):
+        with open(template_file, 'r') as f:
+            email_config['email_template'] = f.read()
+    
+    # Validate email config (every account in 'accounts', or the single top-level one)
+    accounts = email_config.get('accounts') or [email_config]
+    if not all(account.get('sender_email') and account.get('sender_password') for account in accounts):
+        print("\n❌ Error: Email credentials not configured!")
+        print("Please update 'email.sender_email' and 'email.sender_password' in config.json "
+              "(or every entry in 'email.accounts')")
+        print("\nFor Gmail, use an App Password: https://support.google.com/accounts/answer/185833")
+        sys.exit(1)
+    
+    return email_config
+
+
+def print_email_results(email_sender: 'EmailSender', successful: int, failed: int, failed_list: list):
+    """Print the outcome of a send_batch / resume run."""
+    print("=" * 60)
+    print(f"\n✓ Emails sent successfully: {successful}")
+    if email_sender.batch_summary['already_sent']:
+        print(f"  ↻ Already sent earlier in this run (skipped): {email_sender.batch_summary['already_sent']}")
+    if email_sender.batch_summary.get('missing'):
+        print(f"  … Still pending, certificate not generated yet: {email_sender.batch_summary['missing']} "
+              f"(send their run again with --run-id)")
+    if failed > 0:
+        print(f"✗ Emails failed: {failed}")
+        for entry in failed_list:
+            print(f"  - {entry['name'] or '?'} <{entry['email'] or '?'}>: {entry['reason']}")
+    print(f"\nDelivery state is kept in {email_sender.outbox_path}")
+    if email_sender.batch_summary['run']:
+        print(f"Run ID: {email_sender.batch_summary['run']} "
+              f"(pass --run-id {email_sender.batch_summary['run']} to send this run again without duplicates)")
+
+
+def report_profile(instrumentation, profiler, profile_output: str):
+    """Print the stage breakdown and dump cProfile stats, if either was requested."""
+    if instrumentation:
+        print("\n" + "=" * 60)
+        print("Stage breakdown")
+        print("=" * 60)
+        print(instrumentation.report())
+    
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(profile_output)
+        print(f"\ncProfile stats written to {profile_output} (view with: python -m pstats {profile_output})")
 
 
 def main():
@@ -104,6 +132,8 @@ def main():
 Examples:
   python main.py --config config.json --participants participants.csv
   python main.py -c config.json -p participants.xlsx -o ./output
+  python main.py -p participants.csv --jobs 8
+  python main.py --resume              # finish sending emails left pending by an interrupted run
         """
     )
     
@@ -115,7 +145,6 @@ Examples:
     
     parser.add_argument(
         '-p', '--participants',
-        required=True,
         help='Path to participants file (CSV or Excel)'
     )
     
@@ -135,12 +164,72 @@ Examples:
         help='Send certificates via email to participants'
     )
     
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Only send the emails still pending in the outbox from an earlier run, then exit'
+    )
+    
+    parser.add_argument(
+        '--run-id',
+        help='Outbox run to send as; recipients it already reached are skipped (default: a new run)'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Number of worker processes for generation (default: 1, 0 = all CPU cores)'
+    )
+    
+    parser.add_argument(
+        '--combined',
+        metavar='PDF',
+        help='Also write every certificate as one page of a single combined PDF (for printing)'
+    )
+    
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Regenerate every certificate, even ones that are already up to date'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Print a per-stage timing breakdown (overlay, merge, write, SMTP...) at the end'
+    )
+    
+    parser.add_argument(
+        '--profile-output',
+        metavar='FILE',
+        help='Also run under cProfile and dump the stats to FILE (view with: python -m pstats FILE)'
+    )
+    
     args = parser.parse_args()
+    if not args.participants and not args.resume:
+        parser.error("the following arguments are required: -p/--participants")
+    
+    instrumentation = Instrumentation() if args.profile or args.profile_output else None
+    profiler = None
+    if args.profile_output:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
     
     # Load configuration
     print(f"Loading configuration from {args.config}...")
     config = load_config(args.config)
     
+    if args.resume:
+        print("Sending emails left pending by an earlier run...")
+        print("=" * 60)
+        from email_sender import EmailSender
+        email_sender = EmailSender(load_email_config(config), instrumentation)
+        print_email_results(email_sender, *email_sender.resume())
+        report_profile(instrumentation, profiler, args.profile_output)
+        return
+    
     # Override with command line arguments
     if args.template:
         config['template_path'] = args.template
@@ -160,10 +249,13 @@ Examples:
     
     # Load participants
     print(f"Loading participants from {args.participants}...")
-    if args.send_email:
-        participants = load_participants(args.participants, include_emails=True)
-        print(f"Found {len(participants)} participants with emails.")
-        names = [p['name'] for p in participants]
+    multi_field = bool(config.get('fields'))
+    if args.send_email or multi_field:
+        participants = load_participants(args.participants, include_emails=args.send_email,
+                                         include_fields=multi_field)
+        print(f"Found {len(participants)} participants{' with emails' if args.send_email else ''}.")
+        # Multi-field layouts render from the whole row, not just the name
+        names = participants if multi_field else [p['name'] for p in participants]
     else:
         names = load_participants(args.participants, include_emails=False)
         print(f"Found {len(names)} participants.")
@@ -171,56 +263,49 @@ Examples:
     
     # Initialize generator
     print(f"Initializing certificate generator with template: {config['template_path']}")
-    generator = CertificateGenerator(config['template_path'], config)
-    
-    # Generate certificates
-    print(f"\nGenerating certificates...")
-    print("=" * 60)
+    from certificate_generator import CertificateGenerator
+    generator = CertificateGenerator(config['template_path'], config, instrumentation)
     
     filename_template = config.get('filename_template', '{name}_certificate.pdf')
-    successful, failed = generator.generate_batch(names, output_dir, filename_template)
     
+    # With --send-email, each certificate is mailed as soon as it has been generated
+    pipeline = None
+    if args.send_email:
+        from email_sender import EmailSender
+        email_sender = EmailSender(load_email_config(config), instrumentation)
+        pipeline = email_sender.pipeline(participants, output_dir, filename_template, args.run_id)
+    
+    # Generate certificates
+    print(f"\nGenerating certificates{' and sending them via email' if pipeline else ''}...")
     print("=" * 60)
-    print(f"\n✓ Successfully generated: {successful}")
-    if failed > 0:
-        print(f"✗ Failed: {failed}")
-    print(f"\nCertificates saved to: {Path(output_dir).absolute()}")
     
-    # Send emails if requested
-    if args.send_email:
-        print(f"\n" + "=" * 60)
-        print("Sending certificates via email...")
-        print("=" * 60)
-        
-        # Load email config
-        email_config = config.get('email', {})
-        
-        # Load email template if specified
-        template_file = email_config.get('email_template_file')
-        if template_file and os.path.exists(template_file):
-            with open(template_file, 'r') as f:
-                email_config['email_template'] = f.read()
-        
-        # Validate email config
-        if not email_config.get('sender_email') or not email_config.get('sender_password'):
-            print("\n❌ Error: Email credentials not configured!")
-            print("Please update 'email.sender_email' and 'email.sender_password' in config.json")
-            print("\nFor Gmail, use an App Password: https://support.google.com/accounts/answer/185833")
-            sys.exit(1)
-        
-        # Initialize email sender
-        email_sender = EmailSender(email_config)
-        
-        # Send emails
-        email_successful, email_failed = email_sender.send_batch(
-            participants, output_dir, filename_template
-        )
+    with pipeline or nullcontext():
+        successful, failed = generator.generate_batch(names, output_dir, filename_template,
+                                                      jobs=args.jobs, incremental=not args.force,
+                                                      on_certificate=pipeline.submit if pipeline else None)
         
         print("=" * 60)
-        print(f"\n✓ Emails sent successfully: {email_successful}")
-        if email_failed > 0:
-            print(f"✗ Emails failed: {email_failed}")
+        print(f"\n✓ Successfully generated: {successful}")
+        print(f"  ↻ Rebuilt: {generator.batch_summary['rebuilt']}, up to date (skipped): {generator.batch_summary['skipped']}")
+        if failed > 0:
+            print(f"✗ Failed: {failed}")
+        print(f"\nCertificates saved to: {Path(output_dir).absolute()}")
+        if pipeline:
+            print("\nFinishing email delivery...")
+    
+    if pipeline:
+        print_email_results(email_sender, *pipeline.result)
+    
+    if args.combined:
+        print(f"\nWriting combined PDF to {args.combined}...")
+        combined_ok, _ = generator.generate_combined(names, args.combined)
+        if combined_ok:
+            print(f"✓ Combined PDF with {combined_ok} pages saved to: {Path(args.combined).absolute()}")
+    
+    if args.send_email:
         print(f"\n🎉 Process complete!")
+    
+    report_profile(instrumentation, profiler, args.profile_output)
 
 
 if __name__ == '__main__':
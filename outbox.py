@@ -0,0 +1,246 @@
+"""
+Outbox - Durable SQLite queue of certificate emails with per-job state
+"""
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+
+# Job states
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run TEXT NOT NULL,
+    email TEXT NOT NULL,
+    name TEXT NOT NULL,
+    certificate TEXT NOT NULL,
+    certificate_path TEXT NOT NULL,
+    batch INTEGER,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    UNIQUE (run, email, certificate)
+);
+CREATE INDEX IF NOT EXISTS jobs_batch_state ON jobs (batch, state);
+CREATE TABLE IF NOT EXISTS sends (
+    account TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    job INTEGER
+);
+CREATE INDEX IF NOT EXISTS sends_sent_at ON sends (sent_at);
+"""
+
+
+class Outbox:
+    """
+    Persistent record of every (run, recipient, certificate) email job.
+    
+    A job is identified by its run id, the recipient address and the certificate
+    file name. Queueing the same participant again within a run never sends a
+    second copy once the first went out, while a new run (another event reusing
+    the same file name template) mails everyone afresh. Every state change is
+    committed immediately, which means a crash or restart loses at most the
+    message that was in flight.
+    
+    The connection may be used from several threads, but not concurrently: callers
+    sharing an Outbox between threads must serialize access themselves.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Open (or create) the outbox database.
+        
+        Args:
+            path: Path to the SQLite file
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+    
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def start_batch(self) -> int:
+        """Create a new batch and return its id."""
+        with self.conn:
+            return self.conn.execute(
+                "INSERT INTO batches (created_at) VALUES (?)", (time.time(),)
+            ).lastrowid
+    
+    def enqueue(self, batch: int, run: str, email: str, name: str, certificate: str,
+                certificate_path: str) -> sqlite3.Row:
+        """
+        Queue a job in a batch, or move an existing job for the same run, recipient
+        and certificate into it.
+        
+        Jobs that were already sent stay sent; anything else is reset to pending with
+        a fresh attempt count.
+        
+        Args:
+            batch: Batch id from start_batch()
+            run: Run id (part of the job's identity)
+            email: Recipient's email address
+            name: Recipient's name
+            certificate: Certificate file name (part of the job's identity)
+            certificate_path: Full path to the certificate PDF
+        
+        Returns:
+            The job's row after queueing; its state is PENDING or SENT
+        """
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO jobs (run, email, name, certificate, certificate_path, batch, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (run, email, certificate) DO UPDATE SET
+                    name = excluded.name,
+                    certificate_path = excluded.certificate_path,
+                    batch = excluded.batch,
+                    attempts = CASE WHEN state = 'sent' THEN attempts ELSE 0 END,
+                    last_error = CASE WHEN state = 'sent' THEN last_error ELSE NULL END,
+                    next_attempt_at = 0,
+                    state = CASE WHEN state = 'sent' THEN 'sent' ELSE 'pending' END,
+                    updated_at = excluded.updated_at
+                """,
+                (run, email, name, certificate, certificate_path, batch, time.time())
+            )
+            return self.conn.execute(
+                "SELECT * FROM jobs WHERE run = ? AND email = ? AND certificate = ?",
+                (run, email, certificate)
+            ).fetchone()
+    
+    def add_failed(self, batch: int, run: str, email: str, name: str, certificate: str, reason: str):
+        """Record a job that can't be sent at all (e.g. missing address) as failed."""
+        self.enqueue(batch, run, email, name, certificate, '')
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, last_error = ? WHERE run = ? AND email = ? AND certificate = ?",
+                (FAILED, reason, run, email, certificate)
+            )
+    
+    def adopt_pending(self, batch: int) -> int:
+        """
+        Move every pending job, from any batch, into this one (used to resume).
+        
+        Returns:
+            Number of jobs adopted
+        """
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE jobs SET batch = ? WHERE state = ?", (batch, PENDING)
+            ).rowcount
+    
+    def detach(self, job_ids: List[int]):
+        """Take jobs out of their batch, leaving their state as it is."""
+        with self.conn:
+            self.conn.executemany("UPDATE jobs SET batch = NULL WHERE id = ?", [(i,) for i in job_ids])
+    
+    def due(self, batch: int) -> List[sqlite3.Row]:
+        """Get the batch's pending jobs whose next attempt is due, oldest first."""
+        return self.conn.execute(
+            "SELECT * FROM jobs WHERE batch = ? AND state = ? AND next_attempt_at <= ? ORDER BY id",
+            (batch, PENDING, time.time())
+        ).fetchall()
+    
+    def next_attempt_at(self, batch: int) -> Optional[float]:
+        """Get the earliest scheduled retry in the batch, or None if nothing is pending."""
+        return self.conn.execute(
+            "SELECT MIN(next_attempt_at) FROM jobs WHERE batch = ? AND state = ?",
+            (batch, PENDING)
+        ).fetchone()[0]
+    
+    def mark_sent(self, job_id: int, account: Optional[str] = None):
+        """
+        Record a successful delivery.
+        
+        Args:
+            job_id: The job's id
+            account: Sender address it went out from, counted against that account's quota
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, last_error = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (SENT, now, job_id)
+            )
+            if account:
+                self.conn.execute(
+                    "INSERT INTO sends (account, sent_at, job) VALUES (?, ?, ?)", (account, now, job_id)
+                )
+    
+    def mark_retry(self, job_id: int, error: str, delay: float):
+        """Record a transient failure and schedule the next attempt after delay seconds."""
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET attempts = attempts + 1, last_error = ?, next_attempt_at = ?, "
+                "updated_at = ? WHERE id = ?",
+                (error, now + delay, now, job_id)
+            )
+    
+    def mark_failed(self, job_id: int, error: str):
+        """Record a permanent failure (or the last allowed attempt failing)."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, last_error = ?, "
+                "updated_at = ? WHERE id = ?",
+                (FAILED, error, time.time(), job_id)
+            )
+    
+    def recent_sends(self, since: float) -> Dict[str, List[float]]:
+        """
+        Get every send since a point in time, for quota accounting.
+        
+        Returns:
+            Send times (ascending) per sender address
+        """
+        history: Dict[str, List[float]] = {}
+        for account, sent_at in self.conn.execute(
+            "SELECT account, sent_at FROM sends WHERE sent_at > ? ORDER BY sent_at", (since,)
+        ):
+            history.setdefault(account, []).append(sent_at)
+        return history
+    
+    def counts(self, batch: int) -> Dict[str, int]:
+        """Count the batch's jobs by state."""
+        counts = {PENDING: 0, SENT: 0, FAILED: 0}
+        for state, n in self.conn.execute(
+            "SELECT state, COUNT(*) FROM jobs WHERE batch = ? GROUP BY state", (batch,)
+        ):
+            counts[state] = n
+        return counts
+    
+    def failed(self, batch: int) -> List[dict]:
+        """
+        List the batch's failed jobs.
+        
+        Returns:
+            List of dicts with 'name', 'email', 'reason' and 'attempts' keys
+        """
+        return [
+            {'name': row['name'], 'email': row['email'], 'reason': row['last_error'],
+             'attempts': row['attempts']}
+            for row in self.conn.execute(
+                "SELECT * FROM jobs WHERE batch = ? AND state = ? ORDER BY id", (batch, FAILED)
+            )
+        ]
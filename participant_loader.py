@@ -0,0 +1,236 @@
+"""
+Participant Loader - Read participant names, emails and other columns from CSV/Excel
+"""
+import csv
+import io
+import itertools
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+
+# CSV files are parsed this many rows at a time, so huge exports never sit in
+# memory all at once
+CSV_CHUNK_ROWS = 100_000
+
+
+class ParticipantLoadError(Exception):
+    """The participants file can't be used; hint says how to fix it."""
+    
+    def __init__(self, message: str, hint: Optional[str] = None):
+        super().__init__(message)
+        self.hint = hint
+
+
+def field_key(column) -> str:
+    """Turn a column header into the lower_snake_case key used in row dicts."""
+    return str(column).strip().lower().replace(' ', '_')
+
+
+def find_columns(columns) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Find the name and email columns (case-insensitive; the last match wins).
+    
+    Returns:
+        Tuple of (name_column, email_column) positions, either of which may be None
+    """
+    name_column = None
+    email_column = None
+    for i, col in enumerate(columns):
+        if 'name' in str(col).lower():
+            name_column = i
+        if 'email' in str(col).lower() or 'mail' in str(col).lower():
+            email_column = i
+    return name_column, email_column
+
+
+class ParticipantTable:
+    """
+    Participants stored column by column: one list of strings per column.
+    
+    'name' (and 'email', if loaded) are always present; with fields loaded every
+    other column is kept too, under its field_key(), with None for empty cells.
+    """
+    
+    def __init__(self, columns: Dict[str, List[Optional[str]]]):
+        """
+        Args:
+            columns: Column key -> values, all the same length
+        """
+        self.columns = columns
+    
+    def __len__(self) -> int:
+        return len(self.columns['name'])
+    
+    @property
+    def names(self) -> List[str]:
+        """Participant names, in file order."""
+        return self.columns['name']
+    
+    @property
+    def emails(self) -> Optional[List[str]]:
+        """Participant emails, or None if they weren't loaded."""
+        return self.columns.get('email')
+    
+    def records(self) -> List[dict]:
+        """
+        Build one dict per participant, leaving out empty cells.
+        
+        Returns:
+            List of row dicts with 'name' (and 'email') plus any other loaded columns
+        """
+        keys = list(self.columns)
+        return [
+            {key: value for key, value in zip(keys, row) if value is not None}
+            for row in zip(*self.columns.values())
+        ]
+
+
+def _is_excel(source) -> bool:
+    """Tell Excel from CSV by file name (uploaded file objects carry a name too)."""
+    suffix = Path(getattr(source, 'name', str(source))).suffix.lower()
+    if suffix in ('.xlsx', '.xls'):
+        return True
+    if suffix == '.csv' or hasattr(source, 'read'):
+        return False
+    raise ParticipantLoadError(f"Unsupported file format '{suffix}' (use CSV or Excel)")
+
+
+def _check_header(header: List[str], include_emails: bool) -> Tuple[int, Optional[int]]:
+    """
+    Find the name and email column positions, or explain what's missing.
+    
+    Raises:
+        ParticipantLoadError: No name column, or no email column when one is required
+    """
+    name_column, email_column = find_columns(header)
+    available = f"Available columns: {', '.join(header)}"
+    
+    if name_column is None:
+        raise ParticipantLoadError("No 'Name' column found", available)
+    if include_emails and email_column is None:
+        raise ParticipantLoadError(
+            "No 'Email' column found",
+            f"{available}\nFor email sending, your file must have both 'Name' and 'Email' columns."
+        )
+    return name_column, email_column
+
+
+@contextmanager
+def _open_csv(source) -> Iterator[TextIO]:
+    """Open a CSV path, or a (possibly binary, e.g. uploaded) file object, as text."""
+    if not hasattr(source, 'read'):
+        with open(source, newline='', encoding='utf-8-sig') as f:
+            yield f
+    elif isinstance(source, io.TextIOBase):
+        yield source
+    else:
+        text = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+        try:
+            yield text
+        finally:
+            # Hand the file object back to the caller open
+            text.detach()
+
+
+def _csv_chunks(reader, width: int, wanted: List[int], chunk_rows: int) -> Iterator[Dict[int, list]]:
+    """Read csv rows chunk_rows at a time, as {column index: stripped values (None if empty)}."""
+    while True:
+        chunk = {i: [] for i in wanted}
+        appends = [(i, chunk[i].append) for i in wanted]
+        for row in itertools.islice(reader, chunk_rows):
+            if len(row) < width:
+                # Short rows (and blank lines) are padded so every column has a value
+                row += [''] * (width - len(row))
+            for i, append in appends:
+                append(row[i].strip() or None)
+        if not chunk[wanted[0]]:
+            return
+        yield chunk
+
+
+def _load_columns(header: List[str], chunks, include_emails: bool, include_fields: bool,
+                  name_column: int, email_column: Optional[int]) -> Dict[str, List[Optional[str]]]:
+    """Collect the kept rows of each chunk into column lists keyed like ParticipantTable."""
+    keys = [('name', name_column)]
+    if email_column is not None and (include_emails or include_fields):
+        keys.append(('email', email_column))
+    if include_fields:
+        for i, col in enumerate(header):
+            if field_key(col) not in dict(keys):
+                keys.append((field_key(col), i))
+    
+    columns: Dict[str, List[Optional[str]]] = {key: [] for key, _ in keys}
+    for chunk in chunks:
+        names = chunk[name_column]
+        if include_emails:
+            emails = chunk[email_column]
+            keep = [name is not None and email is not None for name, email in zip(names, emails)]
+        else:
+            keep = [name is not None for name in names]
+        for key, i in keys:
+            columns[key].extend(itertools.compress(chunk[i], keep))
+    return columns
+
+
+def _csv_columns(source, include_emails: bool, include_fields: bool, chunk_rows: int):
+    """Load a CSV file with the stdlib csv module (no pandas import needed)."""
+    with _open_csv(source) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        name_column, email_column = _check_header(header, include_emails)
+        wanted = list(range(len(header))) if include_fields else [name_column]
+        if not include_fields and email_column is not None:
+            wanted.append(email_column)
+        chunks = _csv_chunks(reader, len(header), wanted, chunk_rows)
+        return _load_columns(header, chunks, include_emails, include_fields, name_column, email_column)
+
+
+def _excel_columns(source, include_emails: bool, include_fields: bool):
+    """Load an Excel file through pandas, cleaning each column as a whole."""
+    import pandas as pd
+    
+    frame = pd.read_excel(source, dtype=str)
+    header = [str(col) for col in frame.columns]
+    name_column, email_column = _check_header(header, include_emails)
+    chunk = {}
+    for i in (range(len(header)) if include_fields else [name_column, email_column]):
+        if i is None:
+            continue
+        values = frame.iloc[:, i].str.strip()
+        values = values.mask(values == '')
+        chunk[i] = values.astype(object).where(values.notna(), None).tolist()
+    return _load_columns(header, [chunk], include_emails, include_fields, name_column, email_column)
+
+
+def load_participants(source, include_emails: bool = False, include_fields: bool = False,
+                      chunk_rows: int = CSV_CHUNK_ROWS) -> ParticipantTable:
+    """
+    Load participants column by column, without building a dict per row.
+    
+    CSV files are read with the stdlib csv module, chunk_rows rows at a time,
+    so plain CSV input never imports pandas; Excel files go through pandas.
+    Values are stripped, and rows without a name (or, with include_emails,
+    without an email) are dropped. Only the needed columns are
+    cleaned unless include_fields is set.
+    
+    Args:
+        source: Path to a CSV/Excel file, or an open/uploaded file object
+        include_emails: Load the email column too (required to exist)
+        include_fields: Keep every other column as well (for multi-field layouts)
+        chunk_rows: Rows parsed at a time for CSV files
+    
+    Returns:
+        ParticipantTable
+    
+    Raises:
+        ParticipantLoadError: Missing columns, unsupported format or no usable rows
+    """
+    if _is_excel(source):
+        columns = _excel_columns(source, include_emails, include_fields)
+    else:
+        columns = _csv_columns(source, include_emails, include_fields, chunk_rows)
+    
+    if not columns['name']:
+        raise ParticipantLoadError("No valid participant data found")
+    return ParticipantTable(columns)
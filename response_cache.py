@@ -0,0 +1,102 @@
+"""
+Response Cache - Per-form registration responses and counts, cached for a short TTL
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+
+class ResponseCache:
+    """
+    Cache each form's responses for ttl seconds, with a separate response count.
+    
+    Writers call changed() so the next read downloads fresh responses, while the
+    count is adjusted in place: listing forms only needs count(), which never
+    loads response bodies once a count is known. Both expire after ttl so
+    responses written by other processes show up. Safe to share between threads
+    (one instance serves every Streamlit session).
+    """
+    
+    def __init__(self, ttl: float = 30.0):
+        """
+        Args:
+            ttl: Seconds a form's cached responses and count stay valid (0 = no caching)
+        """
+        self.ttl = ttl
+        self._responses: Dict[str, Tuple[float, List[dict]]] = {}
+        self._counts: Dict[str, Tuple[float, int]] = {}
+        # Bumped by every write, so a download that overlapped a write isn't cached
+        self._writes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def _fresh(self, entry) -> bool:
+        """Whether a (cached_at, value) entry is younger than the TTL."""
+        return entry is not None and time.monotonic() - entry[0] < self.ttl
+    
+    def responses(self, form_id: str, load: Callable[[], List[dict]]) -> List[dict]:
+        """
+        Get a form's responses, calling load() if they aren't cached (or have expired).
+        
+        Args:
+            form_id: Form id
+            load: Downloads the form's responses
+        
+        Returns:
+            A new list of the cached response dicts (don't modify the dicts)
+        """
+        with self._lock:
+            entry = self._responses.get(form_id)
+            if self._fresh(entry):
+                return list(entry[1])
+            writes = self._writes.get(form_id, 0)
+        
+        # Load outside the lock so a slow download doesn't hold up other forms
+        responses = load()
+        now = time.monotonic()
+        with self._lock:
+            if self._writes.get(form_id, 0) == writes:
+                self._responses[form_id] = (now, responses)
+                self._counts[form_id] = (now, len(responses))
+        return list(responses)
+    
+    def count(self, form_id: str, count: Callable[[], int]) -> int:
+        """
+        Get a form's response count, calling count() if it isn't known (or has expired).
+        
+        Args:
+            form_id: Form id
+            count: Counts the form's responses without loading them
+        """
+        with self._lock:
+            entry = self._counts.get(form_id)
+            if self._fresh(entry):
+                return entry[1]
+            writes = self._writes.get(form_id, 0)
+        
+        value = count()
+        with self._lock:
+            if self._writes.get(form_id, 0) == writes:
+                self._counts[form_id] = (time.monotonic(), value)
+        return value
+    
+    def changed(self, form_id: str, added: int = 0):
+        """
+        Record a write to a form: drop its cached responses and adjust its count.
+        
+        Args:
+            form_id: Form id
+            added: Responses added (negative for deleted ones)
+        """
+        with self._lock:
+            self._writes[form_id] = self._writes.get(form_id, 0) + 1
+            self._responses.pop(form_id, None)
+            entry = self._counts.get(form_id)
+            if entry is not None:
+                self._counts[form_id] = (entry[0], max(0, entry[1] + added))
+    
+    def forget(self, form_id: str):
+        """Drop everything cached for a form (e.g. when it is deleted)."""
+        with self._lock:
+            self._writes[form_id] = self._writes.get(form_id, 0) + 1
+            self._responses.pop(form_id, None)
+            self._counts.pop(form_id, None)
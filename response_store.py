@@ -0,0 +1,278 @@
+"""
+Response Store - Append-only JSON Lines log of form responses, safe across processes
+"""
+import json
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no advisory locks; fine for a single local process
+    fcntl = None
+
+
+# A delete is logged as {"__delete__": [field, value, ignore_case]}; once a log
+# holds this many, it is rewritten without the deleted responses
+COMPACT_AFTER_DELETES = 50
+DELETE_KEY = '__delete__'
+
+
+class _FieldIndex:
+    """
+    Count of every value one field has among a log's live responses, so
+    append_unless() doesn't have to scan the log.
+    
+    It remembers how far into which file (by inode) it has read. Later calls read
+    only the lines appended since, by any process; a rewritten log (compaction,
+    migration) or a tombstone on another field makes it rebuild from scratch.
+    """
+    
+    def __init__(self, field: str):
+        self.field = field
+        self.inode = None
+        self.offset = 0
+        self.exact: Counter = Counter()
+        self.folded: Counter = Counter()
+    
+    def contains(self, value, ignore_case: bool) -> bool:
+        """Whether a live response has this value."""
+        if ignore_case:
+            return self.folded[_fold(value)] > 0
+        return self.exact[value] > 0
+    
+    def add(self, value):
+        self.exact[value] += 1
+        self.folded[_fold(value)] += 1
+    
+    def delete(self, value, ignore_case: bool):
+        """Apply a tombstone for this field."""
+        if ignore_case and isinstance(value, str):
+            doomed = [v for v in self.exact if isinstance(v, str) and v.lower() == value.lower()]
+        else:
+            doomed = [value]
+        for v in doomed:
+            self.folded[_fold(v)] -= self.exact.pop(v, 0)
+    
+    def refresh(self, store: 'ResponseStore'):
+        """Catch up with the log (the store's lock must be held)."""
+        try:
+            stat = os.stat(store.path)
+        except FileNotFoundError:
+            self.inode, self.offset = None, 0
+            self.exact.clear()
+            self.folded.clear()
+            return
+        rebuild = stat.st_ino != self.inode or stat.st_size < self.offset
+        if not rebuild:
+            with open(store.path, 'rb') as f:
+                f.seek(self.offset)
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if DELETE_KEY not in entry:
+                        self.add(entry.get(self.field))
+                    elif entry[DELETE_KEY][0] == self.field:
+                        self.delete(entry[DELETE_KEY][1], entry[DELETE_KEY][2])
+                    else:
+                        # Which responses it hides depends on other fields
+                        rebuild = True
+                        break
+        if rebuild:
+            self.exact.clear()
+            self.folded.clear()
+            for response in store._read_log():
+                self.add(response.get(self.field))
+        self.inode, self.offset = stat.st_ino, stat.st_size
+
+
+# (log path, field) -> index, shared by every ResponseStore in the process
+_indexes: Dict[Tuple[str, str], _FieldIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+class ResponseStore:
+    """
+    One form's responses as a JSON Lines file, one response per line.
+    
+    Saving a response appends one line instead of rewriting every response, and
+    deleting appends a tombstone that hides the earlier matching responses until
+    compact() rewrites the file without them. Every operation takes an fcntl
+    lock on a separate .lock file (shared for reads, exclusive for writes), so
+    concurrent sessions and processes never lose each other's writes, and
+    compaction can swap in the rewritten file safely. A legacy JSON array file
+    is converted on first use.
+    """
+    
+    def __init__(self, path: str, legacy_path: Optional[str] = None):
+        """
+        Args:
+            path: Path to the .jsonl log
+            legacy_path: Old JSON array file with the same responses, migrated on first use
+        """
+        self.path = path
+        self.legacy_path = legacy_path
+        self.lock_path = path + '.lock'
+    
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """Hold the store's lock (and migrate a legacy file first if there is one)."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.lock_path, 'a') as lock_file:
+            if fcntl:
+                exclusive = exclusive or self._needs_migration()
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                if self._needs_migration():
+                    self._migrate()
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _needs_migration(self) -> bool:
+        """Whether a legacy JSON file is still waiting to be converted."""
+        return bool(self.legacy_path) and os.path.exists(self.legacy_path)
+    
+    def _migrate(self):
+        """Convert the legacy JSON array into the log, keeping the old file as .migrated."""
+        # A log that already exists was written by a migration that stopped before
+        # renaming the legacy file, so only the rename is left to do
+        if not os.path.exists(self.path):
+            try:
+                with open(self.legacy_path, 'r') as f:
+                    responses = json.load(f)
+            except (OSError, ValueError):
+                responses = []
+            self._rewrite(responses)
+        os.replace(self.legacy_path, self.legacy_path + '.migrated')
+    
+    def _rewrite(self, responses: List[dict]):
+        """Atomically replace the log with the given responses (lock must be held exclusively)."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for response in responses:
+                f.write(json.dumps(response) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+    
+    def _lines(self) -> Iterator[dict]:
+        """Every entry in the log, responses and tombstones, in order."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash mid-write
+                        continue
+    
+    def _read_log(self) -> Iterator[dict]:
+        """
+        Stream the live responses: two passes over the file, the first collecting
+        tombstones so the second can skip the responses they delete.
+        """
+        tombstones = [(i, entry[DELETE_KEY]) for i, entry in enumerate(self._lines()) if DELETE_KEY in entry]
+        if not tombstones:
+            yield from self._lines()
+            return
+        for i, entry in enumerate(self._lines()):
+            if DELETE_KEY in entry:
+                continue
+            if not any(i < position and _matches(entry, *match) for position, match in tombstones):
+                yield entry
+    
+    def __iter__(self) -> Iterator[dict]:
+        """
+        Stream the responses in the order they were saved.
+        
+        The shared lock is held until the iteration finishes, so consume it promptly.
+        """
+        with self._locked(exclusive=False):
+            yield from self._read_log()
+    
+    def read(self) -> List[dict]:
+        """Load every response."""
+        return list(self)
+    
+    def _write(self, entry: dict):
+        """Append one entry to the log (lock must be held exclusively)."""
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def append(self, response: dict):
+        """Save one response (appends a single line)."""
+        with self._locked(exclusive=True):
+            self._write(response)
+    
+    def append_unless(self, response: dict, field: str, ignore_case: bool = False) -> bool:
+        """
+        Save a response unless a saved one has the same value in field, e.g. the same email.
+        
+        The check and the append happen under one exclusive lock, so two sessions
+        submitting the same value at once can't both get in. The check uses an
+        in-memory index of the field's values that only reads the lines added
+        since the last call, instead of scanning the whole log.
+        
+        Returns:
+            True if the response was saved, False if it was a duplicate
+        """
+        value = response.get(field)
+        with self._locked(exclusive=True), _indexes_lock:
+            key = (os.path.abspath(self.path), field)
+            index = _indexes.get(key) or _indexes.setdefault(key, _FieldIndex(field))
+            index.refresh(self)
+            if index.contains(value, ignore_case):
+                return False
+            self._write(response)
+            index.refresh(self)
+            return True
+    
+    def delete(self, field: str, value: str, ignore_case: bool = False):
+        """
+        Delete every saved response whose field equals value.
+        
+        Appends a tombstone, and compacts the log once enough have built up.
+        """
+        with self._locked(exclusive=True):
+            self._write({DELETE_KEY: [field, value, ignore_case]})
+            if sum(DELETE_KEY in entry for entry in self._lines()) >= COMPACT_AFTER_DELETES:
+                self._rewrite(list(self._read_log()))
+    
+    def compact(self):
+        """Rewrite the log without tombstones or the responses they deleted."""
+        with self._locked(exclusive=True):
+            self._rewrite(list(self._read_log()))
+    
+    def remove(self):
+        """Delete the log (and the migrated legacy file) from disk."""
+        with self._locked(exclusive=True):
+            migrated = self.legacy_path + '.migrated' if self.legacy_path else None
+            for path in (self.path, migrated):
+                if path and os.path.exists(path):
+                    os.remove(path)
+        os.remove(self.lock_path)
+
+
+def _fold(value):
+    """Case-fold strings for case-insensitive comparison; other values stay as they are."""
+    return value.lower() if isinstance(value, str) else value
+
+
+def _matches(response: dict, field: str, value: str, ignore_case: bool) -> bool:
+    """Whether a tombstone for (field, value) deletes the response."""
+    actual = response.get(field)
+    if ignore_case and isinstance(actual, str) and isinstance(value, str):
+        return actual.lower() == value.lower()
+    return actual == value
@@ -0,0 +1,145 @@
+"""
+Scheduler - Spread email sends across sender accounts within their quotas
+"""
+import bisect
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+
+class Account(NamedTuple):
+    """One sender account and its sending limits (None = unlimited)."""
+    sender_email: str
+    sender_password: str
+    sender_name: str
+    smtp_server: str
+    smtp_port: int
+    daily_quota: Optional[int]
+    hourly_quota: Optional[int]
+
+
+def _window_count(sends: List[float], now: float, window: float) -> int:
+    """Count the (sorted) send times within the last window seconds."""
+    return len(sends) - bisect.bisect_right(sends, now - window)
+
+
+def _available(account: Account, sends: List[float], now: float) -> float:
+    """How many more messages the account may send right now."""
+    available = float('inf')
+    for quota, window in ((account.daily_quota, DAY), (account.hourly_quota, HOUR)):
+        if quota:
+            available = min(available, quota - _window_count(sends, now, window))
+    return max(0.0, available)
+
+
+def _frees_at(account: Account, sends: List[float], now: float) -> float:
+    """The time at which the account will next be allowed to send."""
+    frees_at = now
+    for quota, window in ((account.daily_quota, DAY), (account.hourly_quota, HOUR)):
+        if quota:
+            if _window_count(sends, now, window) >= quota:
+                # Wait until enough of the sends in the window have aged out
+                frees_at = max(frees_at, sends[len(sends) - quota] + window)
+    return frees_at
+
+
+class QuotaScheduler:
+    """
+    Pick the sender account for each message so no account exceeds its rolling
+    daily or hourly quota.
+    
+    Every message goes to the account with the most quota left, spreading the load
+    evenly. When every account is at its limit, acquire() blocks until the oldest
+    send in the full window ages out, so a long batch carries on by itself in the
+    next window. Send times are kept in the outbox (see load()) so the quotas
+    survive restarts and --resume.
+    """
+    
+    def __init__(self, accounts: List[Account]):
+        """
+        Args:
+            accounts: Sender accounts to rotate between
+        """
+        self.accounts = accounts
+        self._sends: Dict[str, List[float]] = {account.sender_email: [] for account in accounts}
+        self._lock = threading.Lock()
+    
+    @property
+    def limited(self) -> bool:
+        """Whether any account has a quota at all."""
+        return any(account.daily_quota or account.hourly_quota for account in self.accounts)
+    
+    def load(self, history: Dict[str, List[float]]):
+        """
+        Seed the quota windows with earlier sends.
+        
+        Args:
+            history: Send times per sender address, e.g. from Outbox.recent_sends()
+        """
+        with self._lock:
+            for email, sends in history.items():
+                if email in self._sends:
+                    self._sends[email] = sorted(sends)
+    
+    def acquire(self) -> Account:
+        """
+        Reserve one message of quota, waiting for the next window if necessary.
+        
+        Returns:
+            The account to send with
+        """
+        announced = None
+        while True:
+            with self._lock:
+                now = time.time()
+                best = max(self.accounts, key=lambda a: _available(a, self._sends[a.sender_email], now))
+                sends = self._sends[best.sender_email]
+                if _available(best, sends, now) >= 1:
+                    # Forget sends that no longer count against any window
+                    del sends[:bisect.bisect_right(sends, now - DAY)]
+                    sends.append(now)
+                    return best
+                wake = min(_frees_at(a, self._sends[a.sender_email], now) for a in self.accounts)
+            if announced != wake:
+                print(f"  ⏸ All sender accounts are at their quota; continuing at "
+                      f"{datetime.fromtimestamp(wake):%Y-%m-%d %H:%M:%S}")
+                announced = wake
+            time.sleep(max(0.0, min(wake - time.time(), 60.0)))
+    
+    def release(self, account: Account):
+        """Give back a reservation whose message wasn't sent."""
+        with self._lock:
+            sends = self._sends[account.sender_email]
+            if sends:
+                sends.pop()
+    
+    def estimate(self, remaining: int, now: Optional[float] = None) -> float:
+        """
+        Estimate when the last of the remaining messages can go out under the quotas.
+        
+        Args:
+            remaining: Number of messages still to send
+            now: Start time (default: now)
+        
+        Returns:
+            Unix time of the last send (now if everything fits in the current windows)
+        """
+        now = time.time() if now is None else now
+        if not self.limited:
+            return now
+        with self._lock:
+            sends = {email: list(times) for email, times in self._sends.items()}
+        t = now
+        while remaining > 0:
+            for account in self.accounts:
+                take = int(min(remaining, _available(account, sends[account.sender_email], t)))
+                sends[account.sender_email].extend([t] * take)
+                remaining -= take
+            if remaining > 0:
+                t = min(_frees_at(a, sends[a.sender_email], t) for a in self.accounts)
+        return t
@@ -0,0 +1,283 @@
+"""
+Sheets - One shared Google Sheets client with cached spreadsheet and worksheet handles
+"""
+import threading
+from typing import Dict, List, Optional
+
+import gspread
+from gspread.utils import numericise_all, rowcol_to_a1
+from google.auth.transport.requests import Request
+from google.oauth2.service_account import Credentials
+
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+# Service account fields read from the [gsheets] secrets section
+SERVICE_ACCOUNT_KEYS = (
+    'type', 'project_id', 'private_key_id', 'private_key', 'client_email', 'client_id',
+    'auth_uri', 'token_uri', 'auth_provider_x509_cert_url', 'client_x509_cert_url',
+)
+
+
+def status_code(error: Exception) -> Optional[int]:
+    """HTTP status of a gspread API error (None for anything else)."""
+    if isinstance(error, gspread.exceptions.APIError):
+        return error.response.status_code
+    return None
+
+
+def _trim(row: List[str]) -> List[str]:
+    """Drop trailing empty cells (the API leaves them out, get_all_values pads them)."""
+    row = list(row)
+    while row and row[-1] == '':
+        row.pop()
+    return row
+
+
+class WorksheetMirror:
+    """
+    Local copy of a worksheet's rows, as get_all_records() would return them.
+    
+    After the first full download, sync() asks only for the header row, the last
+    row it already has and the rows below it, in one request, so a read costs
+    the same however many responses the form has. It downloads everything again
+    only when the header changed or the last known row no longer matches, which
+    means rows were deleted, inserted or sorted. Edits to older rows aren't
+    noticed until the next full download (see SheetsConnection.invalidate()).
+    """
+    
+    def __init__(self):
+        self.header: List[str] = []
+        self.rows: List[List[str]] = []
+        self.records: List[dict] = []
+        self._lock = threading.Lock()
+    
+    def _record(self, row: List[str]) -> dict:
+        """Turn a row into a header -> value dict, with numbers parsed like get_all_records()."""
+        row = list(row) + [''] * (len(self.header) - len(row))
+        return dict(zip(self.header, numericise_all(row[:len(self.header)])))
+    
+    def _full_sync(self, worksheet: gspread.Worksheet):
+        """Download every row."""
+        values = worksheet.get_all_values()
+        self.header = _trim(values[0]) if values else []
+        self.rows = [_trim(row) for row in values[1:]]
+        self.records = [self._record(row) for row in self.rows]
+    
+    def sync(self, worksheet: gspread.Worksheet) -> List[dict]:
+        """
+        Bring the mirror up to date with the worksheet.
+        
+        Returns:
+            A new list of every row as a dict keyed by the header row
+        """
+        with self._lock:
+            if not self.header:
+                self._full_sync(worksheet)
+                return list(self.records)
+            
+            # Sheet row numbers: 1 is the header, so the last known row is len(rows) + 1.
+            # The tail range starts at that row (which must still exist) so it never
+            # reaches past the grid when the sheet has no spare rows.
+            last = len(self.rows) + 1
+            end = rowcol_to_a1(1, len(self.header)).rstrip('0123456789')
+            try:
+                header, tail = worksheet.batch_get(['1:1', f'A{last}:{end}'])
+            except gspread.exceptions.APIError as e:
+                if status_code(e) != 400:
+                    raise
+                # Range outside the grid: rows were deleted
+                header, tail = [], []
+            
+            header = _trim(header[0]) if header else []
+            last_row = _trim(tail[0]) if tail else []
+            if header != self.header or (self.rows and last_row != self.rows[-1]):
+                self._full_sync(worksheet)
+            else:
+                new_rows = [_trim(row) for row in tail[1:]]
+                self.rows.extend(new_rows)
+                self.records.extend(self._record(row) for row in new_rows)
+            return list(self.records)
+
+
+class SheetsConnection:
+    """
+    An authorized gspread client, the opened spreadsheet and its worksheets,
+    kept for the life of the process.
+    
+    Authorizing, opening the spreadsheet by URL and looking up a worksheet are
+    each a round trip to Google, so every handle is created once and reused.
+    The access token is refreshed before it expires, and the whole connection
+    starts over after an authentication error. Worksheet handles are dropped
+    when the worksheet is deleted through this connection, or by recover()
+    when a failed call shows it was removed elsewhere. Safe to share between
+    threads.
+    """
+    
+    def __init__(self, service_account_info: dict, sheet_url: str):
+        """
+        Args:
+            service_account_info: Service account key fields (see SERVICE_ACCOUNT_KEYS)
+            sheet_url: URL of the spreadsheet holding one worksheet per form
+        """
+        self.service_account_info = service_account_info
+        self.sheet_url = sheet_url
+        self._lock = threading.RLock()
+        self._credentials = None
+        self._client = None
+        self._spreadsheet = None
+        self._worksheets: Optional[Dict[str, gspread.Worksheet]] = None
+        self._mirrors: Dict[str, WorksheetMirror] = {}
+        self._headers: Dict[str, List[str]] = {}
+    
+    @classmethod
+    def from_secrets(cls, secrets) -> 'SheetsConnection':
+        """
+        Build a connection from the [gsheets] secrets section.
+        
+        Raises:
+            KeyError: A service account field or sheet_url is missing
+        """
+        info = {key: secrets[key] for key in SERVICE_ACCOUNT_KEYS}
+        return cls(info, secrets['sheet_url'])
+    
+    @property
+    def client(self) -> gspread.Client:
+        """The authorized client, with a fresh access token."""
+        with self._lock:
+            if self._client is None:
+                self._credentials = Credentials.from_service_account_info(
+                    self.service_account_info, scopes=SCOPES
+                )
+                self._client = gspread.authorize(self._credentials)
+            if not self._credentials.valid:
+                # Expired or never fetched: get a token now rather than mid-request
+                self._credentials.refresh(Request())
+            return self._client
+    
+    @property
+    def spreadsheet(self) -> gspread.Spreadsheet:
+        """The spreadsheet, opened once."""
+        with self._lock:
+            client = self.client
+            if self._spreadsheet is None:
+                self._spreadsheet = client.open_by_url(self.sheet_url)
+            return self._spreadsheet
+    
+    def _worksheet_cache(self) -> Dict[str, gspread.Worksheet]:
+        """Handles for every worksheet, listed in a single metadata request."""
+        if self._worksheets is None:
+            self._worksheets = {ws.title: ws for ws in self.spreadsheet.worksheets()}
+        return self._worksheets
+    
+    def worksheet(self, title: str, headers: Optional[List[str]] = None,
+                  rows: int = 1000, cols: int = 20) -> gspread.Worksheet:
+        """
+        Get a worksheet by title, creating it if it doesn't exist and headers are given.
+        
+        Args:
+            title: Worksheet title (the form id)
+            headers: Header row for a newly created worksheet; None to not create one
+            rows: Initial row count for a new worksheet
+            cols: Initial column count for a new worksheet
+        
+        Raises:
+            gspread.exceptions.WorksheetNotFound: No such worksheet and headers is None
+        """
+        with self._lock:
+            listed = self._worksheets is not None
+            worksheets = self._worksheet_cache()
+            if title not in worksheets and listed:
+                # It may have been added since the worksheets were listed
+                self._worksheets = None
+                worksheets = self._worksheet_cache()
+            if title not in worksheets:
+                if headers is None:
+                    raise gspread.exceptions.WorksheetNotFound(title)
+                worksheet = self.spreadsheet.add_worksheet(title=title, rows=rows, cols=cols)
+                if headers:
+                    worksheet.append_row(headers)
+                worksheets[title] = worksheet
+            return worksheets[title]
+    
+    def records(self, title: str) -> List[dict]:
+        """
+        Get every row of a worksheet as dicts, like get_all_records(), from a local
+        mirror that only fetches the rows added since the last call.
+        
+        Raises:
+            gspread.exceptions.WorksheetNotFound: No such worksheet
+        """
+        worksheet = self.worksheet(title)
+        with self._lock:
+            mirror = self._mirrors.setdefault(title, WorksheetMirror())
+        return mirror.sync(worksheet)
+    
+    def header(self, title: str) -> List[str]:
+        """
+        Get a worksheet's header row, from its mirror if it has one, else read once and cached.
+        
+        Raises:
+            gspread.exceptions.WorksheetNotFound: No such worksheet
+        """
+        with self._lock:
+            mirror = self._mirrors.get(title)
+            if mirror is not None and mirror.header:
+                return list(mirror.header)
+            if title not in self._headers:
+                self._headers[title] = _trim(self.worksheet(title).row_values(1))
+            return list(self._headers[title])
+    
+    def delete_worksheet(self, title: str):
+        """Delete a worksheet if it exists, and forget its handle."""
+        with self._lock:
+            self._mirrors.pop(title, None)
+            self._headers.pop(title, None)
+            worksheet = self._worksheet_cache().pop(title, None)
+            if worksheet is not None:
+                self.spreadsheet.del_worksheet(worksheet)
+    
+    def invalidate(self, title: Optional[str] = None):
+        """
+        Forget a worksheet's handle, header and mirror (or all of them), e.g.
+        after it was deleted or renamed outside the app. The next lookup lists
+        the worksheets again and the next records() call downloads every row.
+        """
+        with self._lock:
+            if title is None:
+                self._mirrors.clear()
+                self._headers.clear()
+            else:
+                self._mirrors.pop(title, None)
+                self._headers.pop(title, None)
+            if title is None or self._worksheets is None:
+                self._worksheets = None
+            else:
+                self._worksheets.pop(title, None)
+    
+    def recover(self, error: Exception, title: Optional[str] = None):
+        """
+        Drop whatever cached state a failed call shows to be stale.
+        
+        Args:
+            error: Exception raised by a Sheets call
+            title: Worksheet the call was made on, if any
+        """
+        if status_code(error) == 401:
+            self.refresh()
+        elif isinstance(error, gspread.exceptions.WorksheetNotFound) or status_code(error) in (400, 404):
+            # The worksheet was deleted or renamed outside the app
+            self.invalidate(title)
+    
+    def refresh(self):
+        """Drop the client and every handle, e.g. after the credentials were rejected."""
+        with self._lock:
+            self._credentials = None
+            self._client = None
+            self._spreadsheet = None
+            self._worksheets = None
+            self._mirrors.clear()
+            self._headers.clear()
@@ -0,0 +1,274 @@
+"""
+Sheets Buffer - Durable write-behind queue of form responses for Google Sheets
+"""
+import json
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sheets import SheetsConnection, status_code
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    worksheet TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS rows_worksheet ON rows (worksheet, id);
+"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Whether a failed append is worth retrying with backoff: quota (429), timeouts,
+    server errors, rejected credentials (recover() refreshes them) and dropped
+    connections. Anything else (a protected sheet, a bad range, a deleted form)
+    will fail the same way next time.
+    """
+    code = status_code(error)
+    if code is None:
+        return isinstance(error, OSError)
+    return code in (401, 408, 429) or code >= 500
+
+
+def describe(error: Exception) -> str:
+    """Short description of a failed Sheets call for logs and the admin page."""
+    return 'rate limited' if status_code(error) == 429 else f"{type(error).__name__}: {error}"
+
+
+class SheetsWriteBuffer:
+    """
+    Form responses committed to a local SQLite file first, then appended to their
+    worksheets in batches by a background thread.
+    
+    A submission only waits for one local commit, so a burst of registrations
+    can't exhaust the Sheets per-minute quota or lose rows to a failed API call.
+    The flusher sends each worksheet's queued rows with a single append_rows(),
+    ordered by the worksheet's cached header, and deletes them only after the
+    append succeeded. Worksheets fail independently: after a 429, a server
+    error or a dropped connection the rows stay queued and the flusher backs
+    off exponentially, while rows hitting an error that won't go away (a
+    protected sheet, a deleted form) are parked with the error, see parked(),
+    until retry() is called, so one broken form never holds up the others.
+    Rows left over from a restart are sent by the next flush. Safe to share
+    between threads.
+    """
+    
+    def __init__(self, path: str, sheets: SheetsConnection,
+                 headers_for: Callable[[str], List[str]], interval: float = 2.0,
+                 batch_size: int = 500, max_backoff: float = 120.0):
+        """
+        Args:
+            path: Path to the SQLite file
+            sheets: Connection to the spreadsheet the rows go to
+            headers_for: Header row for a worksheet that has to be created (by form id)
+            interval: Seconds between flushes
+            batch_size: Most rows appended to one worksheet per request
+            max_backoff: Longest wait after repeated failures, in seconds
+        """
+        self.path = path
+        self.sheets = sheets
+        self.headers_for = headers_for
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.failures = 0
+        # Worksheets whose rows the last flush left queued for a retry, with the reason
+        self.errors: Dict[str, str] = {}
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        # _lock serializes database access; _flush_lock keeps read() from seeing a
+        # row both in the sheet and still queued while a flush is appending it
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def add(self, worksheet: str, response: dict):
+        """Queue a response for its worksheet; it is on disk when this returns."""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO rows (worksheet, response, created_at) VALUES (?, ?, ?)",
+                (worksheet, json.dumps(response), time.time())
+            )
+    
+    def pending(self, worksheet: str) -> List[dict]:
+        """Responses still waiting to be appended to the worksheet (parked ones too), oldest first."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT response FROM rows WHERE worksheet = ? ORDER BY id", (worksheet,)
+            ).fetchall()
+        return [json.loads(response) for response, in rows]
+    
+    def pending_count(self, worksheet: str) -> int:
+        """Number of responses still waiting to be appended to the worksheet (parked ones too)."""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM rows WHERE worksheet = ?", (worksheet,)
+            ).fetchone()[0]
+    
+    def read(self, worksheet: str, fetch: Callable[[], List[dict]]) -> List[dict]:
+        """
+        Read a worksheet's responses including the queued ones, without a flush in between.
+        
+        Args:
+            worksheet: Worksheet title (form id)
+            fetch: Reads the responses already in the sheet
+        """
+        with self._flush_lock:
+            return fetch() + self.pending(worksheet)
+    
+    def forget(self, worksheet: str):
+        """Drop a worksheet's queued responses (e.g. when its form is deleted)."""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM rows WHERE worksheet = ?", (worksheet,))
+    
+    def parked(self, worksheet: str) -> Tuple[int, Optional[str]]:
+        """
+        Responses for the worksheet that stopped being retried after a permanent error.
+        
+        Returns:
+            Tuple of (number of parked responses, the latest error or None)
+        """
+        with self._lock:
+            count, error = self.conn.execute(
+                "SELECT COUNT(*), MAX(error) FROM rows WHERE worksheet = ? AND error IS NOT NULL",
+                (worksheet,)
+            ).fetchone()
+        return count, error
+    
+    def retry(self, worksheet: Optional[str] = None):
+        """Queue a worksheet's parked responses (or every parked response) for the next flush."""
+        with self._lock, self.conn:
+            if worksheet is None:
+                self.conn.execute("UPDATE rows SET error = NULL")
+            else:
+                self.conn.execute("UPDATE rows SET error = NULL WHERE worksheet = ?", (worksheet,))
+    
+    def flush(self) -> int:
+        """
+        Append every queued response to its worksheet, one worksheet at a time.
+        
+        A worksheet that fails doesn't stop the others: its rows stay queued and
+        it is listed in self.errors when the error is worth retrying (see
+        is_retryable()), and they are parked otherwise.
+        
+        Returns:
+            Number of responses appended
+        """
+        with self._lock:
+            worksheets = [title for title, in self.conn.execute(
+                "SELECT DISTINCT worksheet FROM rows WHERE error IS NULL ORDER BY worksheet"
+            )]
+        
+        self.errors = {}
+        appended = 0
+        for title in worksheets:
+            while True:
+                with self._lock:
+                    rows = self.conn.execute(
+                        "SELECT id, response FROM rows WHERE worksheet = ? AND error IS NULL "
+                        "ORDER BY id LIMIT ?",
+                        (title, self.batch_size)
+                    ).fetchall()
+                if not rows:
+                    break
+                error = self._send(title, rows)
+                if error is not None:
+                    self._failed(title, error)
+                    break
+                appended += len(rows)
+        return appended
+    
+    def _send(self, title: str, rows: List[tuple]) -> Optional[Exception]:
+        """
+        Append one batch of queued rows to a worksheet and delete them from the queue.
+        
+        Returns:
+            None once the rows are in the sheet, else the exception that stopped them
+        """
+        sheets = self.sheets
+        # A 400/404 can come from a worksheet handle gone stale; recover() drops it,
+        # so one more attempt looks the worksheet up (or creates it) afresh
+        for attempt in range(2):
+            # Submissions keep committing to the database while the batch is sent
+            with self._flush_lock:
+                try:
+                    worksheet = sheets.worksheet(title, headers=self.headers_for(title) or None)
+                    headers = sheets.header(title)
+                    if not headers:
+                        raise ValueError(f"worksheet {title!r} has no header row")
+                    values = [[str(json.loads(response).get(header, '')) for header in headers]
+                              for _, response in rows]
+                    worksheet.append_rows(values)
+                except Exception as e:
+                    sheets.recover(e, title)
+                    if attempt == 0 and status_code(e) in (400, 404):
+                        continue
+                    return e
+                with self._lock, self.conn:
+                    self.conn.execute("DELETE FROM rows WHERE worksheet = ? AND id <= ? AND error IS NULL",
+                                      (title, rows[-1][0]))
+                return None
+    
+    def _failed(self, title: str, error: Exception):
+        """Leave a worksheet's rows queued for a retry, or park them if retrying won't help."""
+        if is_retryable(error):
+            self.errors[title] = describe(error)
+            return
+        with self._lock, self.conn:
+            parked = self.conn.execute(
+                "UPDATE rows SET error = ? WHERE worksheet = ? AND error IS NULL",
+                (describe(error), title)
+            ).rowcount
+        print(f"Sheets buffer: parked {parked} rows for {title!r} ({describe(error)}); "
+              f"they are kept until retry() is called")
+    
+    def _backoff(self) -> float:
+        """Seconds to wait after self.failures consecutive failed flushes."""
+        delay = min(self.max_backoff, self.interval * 2 ** self.failures)
+        return delay + random.uniform(0, delay / 2)
+    
+    def _run(self):
+        """Flusher thread: flush every interval, backing off while worksheets need a retry."""
+        delay = 0.0
+        while not self._stop.wait(delay):
+            try:
+                self.flush()
+            except Exception as e:
+                # The local database itself failed
+                self.errors = {'*': describe(e)}
+            if not self.errors:
+                self.failures = 0
+                delay = self.interval
+                continue
+            self.failures += 1
+            delay = self._backoff()
+            reasons = ', '.join(f"{title}: {reason}" for title, reason in sorted(self.errors.items()))
+            print(f"Sheets buffer: flush failed ({reasons}); retrying in {delay:.1f}s")
+    
+    def start(self) -> 'SheetsWriteBuffer':
+        """
+        Start the background flusher (it also sends rows queued before a restart,
+        and gives rows parked by an earlier process one more try).
+        """
+        if self._thread is None:
+            self.retry()
+            self._thread = threading.Thread(target=self._run, name='sheets-buffer', daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self, flush: bool = True):
+        """Stop the flusher, by default after one last flush."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if flush:
+            self.flush()